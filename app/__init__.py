@@ -1,53 +1,168 @@
 from flask import (
     Flask, render_template, redirect,
-    url_for, request, flash, jsonify
+    url_for, request, flash, jsonify, Response, abort
 )
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 from flask_login import (
     LoginManager, login_user, login_required,
     logout_user, current_user
 )
-from sqlalchemy import or_
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
+import click
+import hmac
+import json
 import os
-import uuid
+import time
+
+from . import http_cache
+from .cache import IdSetCache
+from .config import PROFILES
+from .database import engine_options, init_engine
+from .events import EventHub
+from .identity import IdentityCache
+from .metrics import Metrics
 
 # global extensions
 db = SQLAlchemy()
+migrate = Migrate()
 login_manager = LoginManager()
+events = EventHub()
+id_sets = IdSetCache()
+identities = IdentityCache()
+metrics = Metrics()
 
 
-def create_app():
+def create_app(profile=None, **overrides):
+    """Build the app with the APP_PROFILE (or `profile`) config, then `overrides`."""
     app = Flask(__name__)
 
-    # basic config
-    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key-change-me")
-    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
-        "DATABASE_URL",
-        "sqlite:///app.db"  # for dev; can be changed to Postgres later
-    )
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-    # upload folder
-    upload_folder = os.path.join(app.root_path, "static", "uploads")
-    os.makedirs(upload_folder, exist_ok=True)
-    app.config["UPLOAD_FOLDER"] = upload_folder
-    app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB
+    profile = profile or os.environ.get("APP_PROFILE", "development")
+    app.config.from_object(PROFILES[profile])
+    app.config["UPLOAD_FOLDER"] = os.path.join(app.root_path, "static", "uploads")
+    app.config.update(overrides)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
     @app.errorhandler(413)
     def request_entity_too_large(error):
         return "File too large. Maximum size is 16MB. Please go back.", 413
 
+    @app.after_request
+    def cache_uploads(response):
+        if request.endpoint == "static" and response.status_code in (200, 304):
+            if http_cache.is_immutable_upload(request.view_args.get("filename")):
+                response.headers["Cache-Control"] = http_cache.IMMUTABLE
+        return response
+
     # init extensions
     db.init_app(app)
+    init_engine(app, db)
+    # per-endpoint latency / SQL / size for /metrics, and Server-Timing
+    metrics.init_app(app, db)
+    migrate.init_app(app, db)
+    events.init_app(app)
+    id_sets.init_app(app)
+    identities.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = "login"
     login_manager.login_message_category = "info"
 
-    from .models import User, Pin, Message, Like, SavedPin
+    from .models import (
+        User, Pin, Message, Conversation, Like, SavedPin, Tag, Board, Upload, board_pins,
+        pin_tags, related_pin, backfill_pin_counters,
+    )
+    from .pagination import (
+        keyset_page, id_page, page_size, encode_offset_cursor, decode_offset_cursor,
+        encode_id_cursor, decode_id_cursor, score_page, MAX_PAGE_SIZE,
+    )
+    from . import boards, related, search, storage, timeline, trending, uploads
+    from .tags import attach_tags, backfill_tags
+    from .images import srcset
+    from .jobs import enqueue, run_worker
+    from . import tasks  # noqa: F401  registers job handlers
+
+    def upload_url(filename):
+        return url_for("static", filename="uploads/" + filename)
+
+    @app.template_global()
+    def pin_image(p):
+        """(src, srcset) for a pin card: resized variants when available."""
+        return srcset(p, upload_url)
+
+    def pin_ids_of(model, uid):
+        """id_sets loader for the pin ids in `uid`'s Like / SavedPin rows."""
+        def load(limit=None, within=None):
+            query = db.session.query(model.pin_id).filter_by(user_id=uid)
+            if within is not None:
+                query = query.filter(model.pin_id.in_(within))
+            return [pid for (pid,) in query.limit(limit)]
+        return load
+
+    def viewer_flags(pin_ids):
+        """(liked, saved): which of `pin_ids` the current user liked / saved."""
+        uid = current_user.id
+        liked = id_sets.members(f"liked:{uid}", pin_ids_of(Like, uid), pin_ids)
+        saved = id_sets.members(f"saved:{uid}", pin_ids_of(SavedPin, uid), pin_ids)
+        return liked, saved
+
+    def chat_page(conversation, before_id=None, limit=50):
+        """(messages oldest first, has_more) for the newest `limit` messages
+        of `conversation` older than `before_id`."""
+        if conversation is None:
+            return [], False
+        query = Message.query.options(joinedload(Message.pin)).filter(
+            Message.conversation_id == conversation.id
+        )
+        if before_id is not None:
+            query = query.filter(Message.id < before_id)
+        rows = query.order_by(Message.id.desc()).limit(limit + 1).all()
+        return rows[:limit][::-1], len(rows) > limit
+
+    def mark_read(conversation):
+        """Zero the viewer's unread count. Commits, so call it once the
+        response no longer reads the rows it loaded."""
+        if conversation is not None and conversation.unread_for(current_user.id):
+            Conversation.query.filter_by(id=conversation.id).update(
+                {conversation.unread_column(current_user.id): 0}, synchronize_session=False
+            )
+            db.session.commit()
+
+    def pin_json(p, liked_ids, saved_ids):
+        """Feed card payload shared by every pin-listing API."""
+        thumb_url, thumb_srcset = pin_image(p)
+        return {
+            "id": p.id,
+            "title": p.title,
+            "description": p.description,
+            "author": p.author.username,
+            "created_at": p.created_at.strftime("%Y-%m-%d"),
+            "image_url": upload_url(p.image_filename),
+            "thumb_url": thumb_url,
+            "srcset": thumb_srcset,
+            "width": p.width,
+            "height": p.height,
+            "dominant_color": p.dominant_color,
+            "likes_count": p.like_count,
+            "liked": p.id in liked_ids,
+            "saved": p.id in saved_ids,
+        }
+
+    def board_json(b):
+        """Board list entry; reads nothing beyond the board row."""
+        return {
+            "id": b.id,
+            "name": b.name,
+            "pin_count": b.pin_count,
+            "cover_url": upload_url(b.cover_filename) if b.cover_filename else None,
+        }
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # "id:session_version"; polls authenticate from the cache, not the DB
+        return identities.load(User, user_id)
 
     # ---------- AUTH ROUTES ----------
 
@@ -130,54 +245,78 @@ def create_app():
         chat_with_id = request.args.get("chat_with", type=int)
         share_pin_id = request.args.get("share_pin", type=int)
 
-        pins = Pin.query.order_by(Pin.created_at.desc()).all()
-        users = User.query.filter(User.id != current_user.id).all()
+        # first page only; the feed script pages in the rest from /api/pins
+        pins, _ = keyset_page(
+            Pin.query.options(joinedload(Pin.author)).filter(Pin.processing_state != "failed"),
+            Pin.created_at, Pin.id,
+        )
 
         chat_with_user = None
+        conversation = None
         conversation_messages = []
+        following_chat_user = False
         if chat_with_id:
             chat_with_user = User.query.get(chat_with_id)
             if chat_with_user:
-                conversation_messages = Message.query.filter(
-                    or_(
-                        (Message.sender_id == current_user.id) &
-                        (Message.recipient_id == chat_with_id),
-                        (Message.sender_id == chat_with_id) &
-                        (Message.recipient_id == current_user.id),
-                    )
-                ).order_by(Message.created_at.asc()).all()
-
-        contact_ids = set()
-        all_my_msgs = Message.query.filter(
-            or_(
-                Message.sender_id == current_user.id,
-                Message.recipient_id == current_user.id,
-            )
-        ).all()
-        for m in all_my_msgs:
-            other_id = m.recipient_id if m.sender_id == current_user.id else m.sender_id
-            contact_ids.add(other_id)
+                following_chat_user = timeline.is_following(current_user.id, chat_with_id)
+                conversation = Conversation.between(current_user.id, chat_with_id)
+                conversation_messages, _ = chat_page(conversation)
+
+        conversations = (
+            Conversation.inbox(current_user.id)
+            .options(joinedload(Conversation.user_a), joinedload(Conversation.user_b))
+            .limit(50)
+            .all()
+        )
 
-        contacts = User.query.filter(User.id.in_(contact_ids)).all() if contact_ids else []
+        user_boards = (
+            Board.query.filter_by(user_id=current_user.id)
+            .order_by(Board.created_at.desc())
+            .all()
+        )
 
         share_pin = Pin.query.get(share_pin_id) if share_pin_id else None
 
         # liked/saved state
-        user_liked_ids = {like.pin_id for like in current_user.likes}
-        user_saved_ids = {save.pin_id for save in current_user.saves}
+        user_liked_ids, user_saved_ids = viewer_flags([p.id for p in pins])
 
-        return render_template(
+        page = render_template(
             "dashboard.html",
             pins=pins,
-            users=users,
             active_tab=active_tab,
             chat_with_user=chat_with_user,
+            following_chat_user=following_chat_user,
             messages=conversation_messages,
-            contacts=contacts,
+            conversations=conversations,
+            boards=user_boards,
             share_pin=share_pin,
             user_liked_ids=user_liked_ids,
             user_saved_ids=user_saved_ids,
         )
+        # after rendering: the commit expires every row the page reads
+        mark_read(conversation)
+        return page
+
+    def create_pin(title, description, tags, filename):
+        """A pending pin for a stored upload (store_* took its blob
+        reference); the worker makes its variants."""
+        pin = Pin(
+            title=title,
+            description=description,
+            tags=tags,
+            image_filename=filename,
+            author=current_user,
+            processing_state="pending",
+        )
+        db.session.add(pin)
+        attach_tags(pin, tags)
+        db.session.flush()
+        # resizing etc. happens in `flask worker`, not on this request thread
+        enqueue("process_pin_image", pin_id=pin.id)
+        enqueue("fan_out_pin", pin_id=pin.id)
+        db.session.commit()
+        events.publish("feed", "pin_created", id=pin.id)
+        return pin
 
     @app.route("/upload", methods=["POST"])
     @login_required
@@ -191,32 +330,98 @@ def create_app():
             flash("Title and image are required.", "danger")
             return redirect(url_for("dashboard", tab="upload"))
 
-        allowed_ext = {"jpg", "jpeg", "png", "gif"}
-        if "." not in image.filename:
-            flash("Invalid image file.", "danger")
-            return redirect(url_for("dashboard", tab="upload"))
-
-        ext = image.filename.rsplit(".", 1)[1].lower()
-        if ext not in allowed_ext:
+        # the first bytes decide the format, not the file name
+        ext = uploads.sniff(image.stream.read(uploads.SNIFF_BYTES))
+        image.stream.seek(0)
+        if ext is None:
             flash("Only JPG, JPEG, PNG, GIF allowed.", "danger")
             return redirect(url_for("dashboard", tab="upload"))
 
-        filename = f"{uuid.uuid4().hex}.{ext}"
-        save_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        image.save(save_path)
+        # named by content hash: re-uploads of the same image share one file
+        filename, _ = storage.store_stream(image.stream, app.config["UPLOAD_FOLDER"], ext)
+        create_pin(title, description, tags, filename)
 
-        pin = Pin(
-            title=title,
-            description=description,
-            tags=tags,
-            image_filename=filename,
-            author=current_user,
-        )
-        db.session.add(pin)
+        flash("Pin uploaded!", "success")
+        return redirect(url_for("dashboard", tab="home"))
+
+    # ---------- CHUNKED UPLOADS (app/uploads.py) ----------
+
+    def owned_upload(upload_id):
+        upload = Upload.query.get_or_404(upload_id)
+        if upload.user_id != current_user.id:
+            abort(403)
+        return upload
+
+    @app.route("/api/uploads", methods=["POST"])
+    @login_required
+    def api_upload_start():
+        data = request.get_json(silent=True) or {}
+        try:
+            upload = uploads.start(
+                current_user.id, int(data.get("size") or 0), app.config["MAX_CONTENT_LENGTH"]
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
         db.session.commit()
+        return jsonify({
+            "ok": True,
+            "id": upload.id,
+            "offset": 0,
+            "chunk_size": uploads.CLIENT_CHUNK_SIZE,
+        }), 201
+
+    @app.route("/api/uploads/<upload_id>", methods=["GET", "PUT", "DELETE"])
+    @login_required
+    def api_upload(upload_id):
+        upload = owned_upload(upload_id)
+        folder = app.config["UPLOAD_FOLDER"]
+
+        if request.method == "DELETE":
+            uploads.discard(folder, upload)
+            db.session.commit()
+            return jsonify({"ok": True})
 
+        offset = uploads.received(folder, upload)
+        if request.method == "PUT":
+            try:
+                offset = uploads.write_chunk(
+                    folder, upload, request.stream, request.args.get("offset", type=int)
+                )
+            except uploads.OffsetMismatch as e:
+                # a resent, out-of-order or concurrent chunk; the client
+                # continues from `offset`
+                return jsonify({"ok": False, "error": str(e), "offset": e.offset}), 409
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({"ok": False, "error": str(e), "offset": offset}), 400
+            db.session.commit()
+
+        return jsonify({
+            "ok": True,
+            "offset": offset,
+            "size": upload.size,
+            "chunk_size": uploads.CLIENT_CHUNK_SIZE,
+        })
+
+    @app.route("/api/uploads/<upload_id>/finish", methods=["POST"])
+    @login_required
+    def api_upload_finish(upload_id):
+        upload = owned_upload(upload_id)
+        title = request.form.get("title")
+        if not title:
+            return jsonify({"ok": False, "error": "Title is required."}), 400
+        try:
+            filename = uploads.finish(app.config["UPLOAD_FOLDER"], upload)
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        pin = create_pin(title, request.form.get("description"), request.form.get("tags"), filename)
         flash("Pin uploaded!", "success")
-        return redirect(url_for("dashboard", tab="home"))
+        return jsonify({
+            "ok": True,
+            "pin_id": pin.id,
+            "redirect": url_for("dashboard", tab="home"),
+        }), 201
 
     # ---------- PROFILE (liked + saved pins) ----------
 
@@ -260,14 +465,26 @@ def create_app():
         if existing:
             db.session.delete(existing)
             liked = False
+            # take back exactly what the like added when it was made
+            boost = -trending.recorded("like", existing.created_at)
         else:
-            db.session.add(Like(user_id=current_user.id, pin_id=pin.id))
+            now = datetime.utcnow()
+            db.session.add(Like(user_id=current_user.id, pin_id=pin.id, created_at=now))
             liked = True
-
+            boost = trending.contribution("like", now)
+
+        # atomic in-database increment, so concurrent toggles can't lose updates;
+        # updated_at lets delta polls of /api/pins pick up the change
+        Pin.query.filter_by(id=pin.id).update({
+            Pin.like_count: Pin.like_count + (1 if liked else -1),
+            Pin.trending_score: Pin.trending_score + boost,
+            Pin.updated_at: datetime.utcnow(),
+        }, synchronize_session=False)
         db.session.commit()
-        count = Like.query.filter_by(pin_id=pin.id).count()
+        id_sets.invalidate(f"liked:{current_user.id}")
+        events.publish("feed", "pin_likes", id=pin.id, likes_count=pin.like_count)
 
-        return jsonify({"ok": True, "liked": liked, "count": count})
+        return jsonify({"ok": True, "liked": liked, "count": pin.like_count})
 
     @app.route("/pin/<int:pin_id>/save", methods=["POST"])
     @login_required
@@ -282,11 +499,20 @@ def create_app():
         if existing:
             db.session.delete(existing)
             saved = False
+            boost = -trending.recorded("save", existing.created_at)
         else:
-            db.session.add(SavedPin(user_id=current_user.id, pin_id=pin.id))
+            now = datetime.utcnow()
+            db.session.add(SavedPin(user_id=current_user.id, pin_id=pin.id, created_at=now))
             saved = True
+            boost = trending.contribution("save", now)
 
+        Pin.query.filter_by(id=pin.id).update({
+            Pin.save_count: Pin.save_count + (1 if saved else -1),
+            Pin.trending_score: Pin.trending_score + boost,
+            Pin.updated_at: datetime.utcnow(),
+        }, synchronize_session=False)
         db.session.commit()
+        id_sets.invalidate(f"saved:{current_user.id}")
 
         return jsonify({"ok": True, "saved": saved})
 
@@ -351,14 +577,31 @@ def create_app():
             flash(msg, "danger")
             return redirect(url_for("dashboard", tab="messages", chat_with=recipient_id))
 
+        conversation = Conversation.get_or_create(current_user.id, recipient_id)
         msg_obj = Message(
             sender_id=current_user.id,
             recipient_id=recipient_id,
+            conversation_id=conversation.id,
             text=text if text else None,
             pin_id=pin.id if pin else None,
         )
         db.session.add(msg_obj)
+        db.session.flush()
+        # inbox summary; the recipient's unread count is bumped in SQL so
+        # two messages sent at once both count
+        unread = conversation.unread_column(recipient_id)
+        Conversation.query.filter_by(id=conversation.id).update({
+            Conversation.last_message_id: msg_obj.id,
+            Conversation.last_activity: msg_obj.created_at,
+            unread: unread + 1,
+        }, synchronize_session=False)
         db.session.commit()
+        for uid in (current_user.id, recipient_id):
+            events.publish(
+                f"user:{uid}", "message_created",
+                id=msg_obj.id, conversation_id=conversation.id,
+                sender_id=current_user.id, recipient_id=recipient_id,
+            )
 
         if is_ajax:
             return jsonify({"ok": True})
@@ -371,16 +614,44 @@ def create_app():
     @app.route("/api/messages_for/<int:user_id>")
     @login_required
     def api_messages_for(user_id):
-        other = User.query.get_or_404(user_id)
+        """Chat history with `user_id`, oldest first.
+
+        Without arguments: the newest `limit` messages. `before_id` pages
+        backward from the oldest message the client has (`has_more` says
+        whether there is anything left); `after_id` fetches up to `limit`
+        new messages, with `has_more` telling the client to poll again.
+        """
+        after_id = request.args.get("after_id", type=int)
+        before_id = request.args.get("before_id", type=int)
+        limit = page_size(request.args.get("limit"), default=50)
+
+        # the conversation row is the version stamp: its last message and the
+        # viewer's unread count change with anything this response would show
+        conversation = Conversation.between(current_user.id, user_id)
+        etag = http_cache.version_etag(
+            current_user.id, user_id, sorted(request.args.items(multi=True)),
+            conversation.last_message_id if conversation else None,
+            conversation.unread_for(current_user.id) if conversation else 0,
+        )
+        if http_cache.is_fresh(etag):
+            return http_cache.not_modified(etag)
 
-        msgs = Message.query.filter(
-            or_(
-                (Message.sender_id == current_user.id) &
-                (Message.recipient_id == user_id),
-                (Message.sender_id == user_id) &
-                (Message.recipient_id == current_user.id),
+        other = User.query.get_or_404(user_id)
+        if conversation is None:
+            msgs, has_more = [], False
+        elif after_id is not None:
+            # delta poll: messages the client hasn't seen yet, at most `limit`;
+            # with has_more the client polls again from the last one
+            rows = (
+                Message.query.options(joinedload(Message.pin))
+                .filter(Message.conversation_id == conversation.id, Message.id > after_id)
+                .order_by(Message.id.asc())
+                .limit(limit + 1)
+                .all()
             )
-        ).order_by(Message.created_at.asc()).all()
+            msgs, has_more = rows[:limit], len(rows) > limit
+        else:
+            msgs, has_more = chat_page(conversation, before_id=before_id, limit=limit)
 
         result = []
         for m in msgs:
@@ -398,10 +669,41 @@ def create_app():
                     )
                 } if m.pin else None
             })
-
-        return jsonify({
+        response = jsonify({
             "other_username": other.username,
-            "messages": result
+            "messages": result,
+            "has_more": has_more,
+        })
+        if before_id is None:
+            # after serializing: the commit expires every row read above
+            mark_read(conversation)
+        return http_cache.with_etag(response, etag)
+
+    # ---------- LIVE EVENT STREAM ----------
+
+    @app.route("/api/stream")
+    @login_required
+    def api_stream():
+        """Server-Sent Events: feed activity plus this user's DMs.
+
+        The generator never touches the database, so an idle connection
+        costs a parked thread and nothing else. Each connection holds a
+        worker thread; run a threaded or async server.
+        """
+        channels = ["feed", f"user:{current_user.id}"]
+
+        def generate():
+            yield "retry: 5000\n\n"
+            for payload in events.listen(channels):
+                if payload is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event_type = json.loads(payload)["type"]
+                yield f"event: {event_type}\ndata: {payload}\n\n"
+
+        return Response(generate(), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
         })
 
     # ---------- PINS API (live home feed) ----------
@@ -409,35 +711,102 @@ def create_app():
     @app.route("/api/pins")
     @login_required
     def api_pins():
+        """Newest-first pin feed, one page per request.
+
+        Pass the returned `next_cursor` back as `?cursor=` to fetch the
+        following page; `limit` caps the page size. With `q` the results
+        come from the search index, best match first.
+
+        Delta mode: with `after_id` (highest pin id the client has) and
+        `since` (the `server_time` of its previous response) only pins
+        newer than `after_id` are returned, plus `likes`, the like count
+        and liked/saved state of older pins touched since then.
+        `reset` tells the client the gap is too large to patch.
+        """
         q = request.args.get("q", "").strip()
-        query = Pin.query
-        if q:
-            query = query.filter(
-                or_(
-                    Pin.title.ilike(f"%{q}%"),
-                    Pin.description.ilike(f"%{q}%"),
-                    Pin.tags.ilike(f"%{q}%")
+        cursor = request.args.get("cursor")
+        limit = page_size(request.args.get("limit"))
+        after_id = request.args.get("after_id", type=int)
+        server_time = datetime.utcnow()
+
+        # any new pin, like/save toggle or finished upload moves one of these;
+        # separate subqueries so each MAX is a single index lookup
+        version = db.session.execute(select(
+            select(func.max(Pin.id)).scalar_subquery(),
+            select(func.max(Pin.updated_at)).scalar_subquery(),
+        )).one()
+        etag = http_cache.version_etag(
+            current_user.id, sorted(request.args.items(multi=True)), tuple(version)
+        )
+        if http_cache.is_fresh(etag):
+            return http_cache.not_modified(etag)
+
+        query = Pin.query.options(joinedload(Pin.author)).filter(
+            Pin.processing_state != "failed"
+        )
+
+        changed = []
+        reset = False
+        if after_id is not None:
+            since = None
+            if request.args.get("since"):
+                try:
+                    since = datetime.fromisoformat(request.args["since"])
+                except ValueError:
+                    return jsonify({"ok": False, "error": "Invalid since."}), 400
+
+            if q:
+                query = search.filter_pins(query, q)
+            pins = query.filter(Pin.id > after_id).order_by(Pin.id.desc()).limit(limit + 1).all()
+            next_cursor = None
+            if len(pins) > limit:
+                pins = []
+                reset = True
+            elif since:
+                changed = (
+                    db.session.query(Pin.id, Pin.like_count)
+                    .filter(Pin.updated_at >= since, Pin.id <= after_id)
+                    .order_by(Pin.updated_at.desc())
+                    .limit(MAX_PAGE_SIZE)
+                    .all()
                 )
-            )
-        pins = query.order_by(Pin.created_at.desc()).all()
-
-        user_liked_ids = {like.pin_id for like in current_user.likes}
-        user_saved_ids = {save.pin_id for save in current_user.saves}
-
-        items = []
-        for p in pins:
-            items.append({
-                "id": p.id,
-                "title": p.title,
-                "description": p.description,
-                "author": p.author.username,
-                "created_at": p.created_at.strftime("%Y-%m-%d"),
-                "image_url": url_for("static", filename="uploads/" + p.image_filename),
-                "likes_count": len(p.likes),
-                "liked": p.id in user_liked_ids,
-                "saved": p.id in user_saved_ids,
-            })
-        return jsonify({"pins": items})
+        elif q:
+            try:
+                offset = decode_offset_cursor(cursor) if cursor else 0
+            except ValueError as e:
+                return jsonify({"ok": False, "error": str(e)}), 400
+
+            ids = search.ranked_pin_ids(q, offset=offset, limit=limit + 1)
+            next_cursor = encode_offset_cursor(offset + limit) if len(ids) > limit else None
+            ids = ids[:limit]
+            by_id = {p.id: p for p in query.filter(Pin.id.in_(ids))} if ids else {}
+            pins = [by_id[pid] for pid in ids if pid in by_id]
+        else:
+            try:
+                pins, next_cursor = keyset_page(
+                    query, Pin.created_at, Pin.id, cursor=cursor, limit=limit
+                )
+            except ValueError as e:
+                return jsonify({"ok": False, "error": str(e)}), 400
+
+        user_liked_ids, user_saved_ids = viewer_flags(
+            [p.id for p in pins] + [pid for pid, _ in changed]
+        )
+
+        changed = [{
+            "id": pid,
+            "likes_count": like_count,
+            "liked": pid in user_liked_ids,
+            "saved": pid in user_saved_ids,
+        } for pid, like_count in changed]
+
+        return http_cache.with_etag(jsonify({
+            "pins": [pin_json(p, user_liked_ids, user_saved_ids) for p in pins],
+            "next_cursor": next_cursor,
+            "likes": changed,
+            "reset": reset,
+            "server_time": server_time.isoformat(),
+        }), etag)
 
     # ---------- USER SEARCH API ----------
 
@@ -448,44 +817,563 @@ def create_app():
         if not q:
             return jsonify({"results": []})
 
-        users = User.query.filter(
-            User.username.ilike(f"%{q}%")
-        ).limit(10).all()
+        limit = page_size(request.args.get("limit"), default=10, maximum=25)
+        users = search.search_users(q, limit=limit, exclude_id=current_user.id)
 
         return jsonify({
             "results": [
                 {"id": u.id, "username": u.username}
-                for u in users if u.id != current_user.id
+                for u in users
             ]
         })
 
+    # ---------- FOLLOWING ----------
+
+    @app.route("/users/<int:user_id>/follow", methods=["POST"])
+    @login_required
+    def follow_user(user_id):
+        other = User.query.get_or_404(user_id)
+        if other.id == current_user.id:
+            return jsonify({"ok": False, "error": "You cannot follow yourself."}), 400
+
+        if timeline.is_following(current_user.id, other.id):
+            timeline.unfollow(current_user.id, other.id)
+            following = False
+        else:
+            timeline.follow(current_user.id, other.id)
+            following = True
+        db.session.commit()
+
+        return jsonify({"ok": True, "following": following, "follower_count": other.follower_count})
+
+    @app.route("/api/feed/following")
+    @login_required
+    def api_following_feed():
+        """Pins from people the current user follows, newest first, paged via `next_cursor`."""
+        limit = page_size(request.args.get("limit"))
+        cursor = request.args.get("cursor")
+        try:
+            before = decode_id_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        ids, has_more = timeline.feed_ids(current_user.id, before=before, limit=limit)
+        next_cursor = encode_id_cursor(ids[-1]) if has_more else None
+        by_id = {
+            p.id: p for p in Pin.query.options(joinedload(Pin.author)).filter(
+                Pin.id.in_(ids), Pin.processing_state != "failed"
+            )
+        } if ids else {}
+        pins = [by_id[pid] for pid in ids if pid in by_id]
+
+        user_liked_ids, user_saved_ids = viewer_flags([p.id for p in pins])
+        return jsonify({
+            "pins": [pin_json(p, user_liked_ids, user_saved_ids) for p in pins],
+            "next_cursor": next_cursor,
+        })
+
+    # ---------- BOARDS ----------
+
+    def owned_board(board_id):
+        board = Board.query.get_or_404(board_id)
+        if board.user_id != current_user.id:
+            abort(403)
+        return board
+
+    @app.route("/api/boards", methods=["GET", "POST"])
+    @login_required
+    def api_boards():
+        if request.method == "POST":
+            data = request.get_json(silent=True) or {}
+            name = (data.get("name") or "").strip()
+            if not name:
+                return jsonify({"ok": False, "error": "Board name is required."}), 400
+            board = Board(name=name[:100], user_id=current_user.id)
+            db.session.add(board)
+            db.session.commit()
+            return jsonify({"ok": True, "board": board_json(board)})
+
+        user_id = request.args.get("user_id", type=int) or current_user.id
+        rows = (
+            Board.query.filter_by(user_id=user_id)
+            .order_by(Board.created_at.desc())
+            .all()
+        )
+        return jsonify({"boards": [board_json(b) for b in rows]})
+
+    @app.route("/api/boards/<int:board_id>", methods=["DELETE"])
+    @login_required
+    def api_delete_board(board_id):
+        board = owned_board(board_id)
+        unused = boards.delete_board(board)
+        db.session.commit()
+        if unused:
+            storage.delete_unused(app.config["UPLOAD_FOLDER"], unused)
+        return jsonify({"ok": True})
+
+    @app.route("/api/boards/<int:board_id>/pins", methods=["GET", "POST"])
+    @login_required
+    def api_board_pins(board_id):
+        """GET: the board's pins, newest first, paged via `next_cursor`.
+
+        POST {"add": [pin ids], "remove": [pin ids]}: change membership in
+        one transaction; the cover is rebuilt in the background.
+        """
+        if request.method == "POST":
+            board = owned_board(board_id)
+            data = request.get_json(silent=True) or {}
+            try:
+                add_ids = [int(i) for i in data.get("add") or []]
+                remove_ids = [int(i) for i in data.get("remove") or []]
+            except (TypeError, ValueError):
+                return jsonify({"ok": False, "error": "Pin ids must be integers."}), 400
+            if len(add_ids) + len(remove_ids) > boards.MAX_BULK_PINS:
+                return jsonify({
+                    "ok": False,
+                    "error": f"At most {boards.MAX_BULK_PINS} pins per request.",
+                }), 400
+
+            removed = boards.remove_pins(board, remove_ids)
+            added = boards.add_pins(board, add_ids)
+            if added or removed:
+                enqueue("build_board_cover", board_id=board.id)
+            db.session.commit()
+            return jsonify({
+                "ok": True, "added": added, "removed": removed, "pin_count": board.pin_count,
+            })
+
+        board = Board.query.get_or_404(board_id)
+        limit = page_size(request.args.get("limit"))
+        query = (
+            Pin.query.options(joinedload(Pin.author))
+            .join(board_pins, board_pins.c.pin_id == Pin.id)
+            .filter(board_pins.c.board_id == board.id)
+        )
+        try:
+            pins, next_cursor = id_page(
+                query, board_pins.c.pin_id, cursor=request.args.get("cursor"),
+                limit=limit, row_id=lambda p: p.id,
+            )
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        user_liked_ids, user_saved_ids = viewer_flags([p.id for p in pins])
+        return jsonify({
+            "board": board_json(board),
+            "pins": [pin_json(p, user_liked_ids, user_saved_ids) for p in pins],
+            "next_cursor": next_cursor,
+        })
+
+    # ---------- TAGS API ----------
+
+    @app.route("/api/tags/<name>/pins")
+    @login_required
+    def api_tag_pins(name):
+        """Pins carrying a tag, newest first, paged via `next_cursor`."""
+        tag = Tag.query.filter_by(name=name.lstrip("#").lower()).first_or_404()
+        limit = page_size(request.args.get("limit"))
+
+        query = (
+            Pin.query.options(joinedload(Pin.author))
+            .join(pin_tags, pin_tags.c.pin_id == Pin.id)
+            .filter(pin_tags.c.tag_id == tag.id)
+        )
+        try:
+            pins, next_cursor = id_page(
+                query, pin_tags.c.pin_id, cursor=request.args.get("cursor"),
+                limit=limit, row_id=lambda p: p.id,
+            )
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        user_liked_ids, user_saved_ids = viewer_flags([p.id for p in pins])
+
+        return jsonify({
+            "tag": {"name": tag.name, "pin_count": tag.pin_count},
+            "pins": [pin_json(p, user_liked_ids, user_saved_ids) for p in pins],
+            "next_cursor": next_cursor,
+        })
+
+    @app.route("/api/tags/popular")
+    @login_required
+    def api_popular_tags():
+        limit = page_size(request.args.get("limit"), default=20, maximum=50)
+        tags = (
+            Tag.query.filter(Tag.pin_count > 0)
+            .order_by(Tag.pin_count.desc())
+            .limit(limit)
+            .all()
+        )
+        return jsonify({
+            "tags": [{"name": t.name, "pin_count": t.pin_count} for t in tags]
+        })
+
+    # ---------- EXPLORE ----------
+
+    @app.route("/api/explore")
+    @login_required
+    def api_explore():
+        """Trending pins (see app/trending.py), hottest first, paged via `next_cursor`."""
+        limit = page_size(request.args.get("limit"))
+        query = Pin.query.options(joinedload(Pin.author)).filter(
+            Pin.processing_state != "failed"
+        )
+        try:
+            pins, next_cursor = score_page(
+                query, Pin.trending_score, Pin.id,
+                cursor=request.args.get("cursor"), limit=limit,
+            )
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        user_liked_ids, user_saved_ids = viewer_flags([p.id for p in pins])
+        return jsonify({
+            "pins": [pin_json(p, user_liked_ids, user_saved_ids) for p in pins],
+            "next_cursor": next_cursor,
+        })
+
+    # ---------- RELATED PINS ----------
+
+    @app.route("/api/pins/<int:pin_id>/related")
+    @login_required
+    def api_related_pins(pin_id):
+        """"More like this": neighbours precomputed by `flask build-related`, best first."""
+        limit = page_size(request.args.get("limit"), default=12, maximum=related.TOP_K)
+        pins = (
+            Pin.query.options(joinedload(Pin.author))
+            .join(related_pin, related_pin.c.related_id == Pin.id)
+            .filter(
+                related_pin.c.pin_id == pin_id,
+                related_pin.c.rank < limit,
+                Pin.processing_state != "failed",
+            )
+            .order_by(related_pin.c.rank)
+            .all()
+        )
+
+        user_liked_ids, user_saved_ids = viewer_flags([p.id for p in pins])
+        return jsonify({
+            "pins": [pin_json(p, user_liked_ids, user_saved_ids) for p in pins],
+        })
+
     # ---------- COMMENTS API ----------
 
+    def comment_json(c, authors):
+        author = authors.get(c.user_id, "?")
+        return {
+            "id": c.id,
+            "text": c.text,
+            "author": author,
+            "author_initial": author[0].upper(),
+            "created_at": c.created_at.strftime("%Y-%m-%d %H:%M"),
+            "parent_id": c.parent_id,
+            "reply_count": c.reply_count,
+        }
+
     @app.route("/api/pins/<int:pin_id>/comments", methods=["GET", "POST"])
     @login_required
     def api_comments(pin_id):
+        """GET ?order=newest|oldest&cursor=&limit= pages a pin's top-level
+        comments; ?parent=<id> pages that comment's replies, oldest first.
+        POST {"text", "parent_id"?} adds a comment or a reply."""
         from .models import Comment
         pin = Pin.query.get_or_404(pin_id)
         if request.method == "POST":
             data = request.get_json()
             text = data.get("text", "").strip() if data else ""
-            if text:
-                c = Comment(text=text, user_id=current_user.id, pin_id=pin.id)
-                db.session.add(c)
-                db.session.commit()
-                return jsonify({"ok": True})
-            return jsonify({"ok": False}), 400
-
-        # GET
-        comments = Comment.query.filter_by(pin_id=pin.id).order_by(Comment.created_at.asc()).all()
-        return jsonify({
-            "comments": [{
-                "id": c.id,
-                "text": c.text,
-                "author": c.user.username,
-                "author_initial": c.user.username[0].upper(),
-                "created_at": c.created_at.strftime("%Y-%m-%d %H:%M")
-            } for c in comments]
-        })
+            if not text:
+                return jsonify({"ok": False}), 400
+
+            parent_id = data.get("parent_id")
+            if parent_id is not None:
+                parent = db.session.get(Comment, parent_id) if isinstance(parent_id, int) else None
+                if parent is None or parent.pin_id != pin.id:
+                    return jsonify({"ok": False, "error": "Unknown parent comment."}), 400
+                # replying to a reply continues the same thread
+                parent_id = parent.parent_id or parent.id
+                Comment.query.filter_by(id=parent_id).update(
+                    {Comment.reply_count: Comment.reply_count + 1}, synchronize_session=False
+                )
+
+            c = Comment(text=text, user_id=current_user.id, pin_id=pin.id, parent_id=parent_id)
+            db.session.add(c)
+            Pin.query.filter_by(id=pin.id).update(
+                {
+                    Pin.comment_count: Pin.comment_count + 1,
+                    Pin.trending_score: Pin.trending_score + trending.contribution("comment"),
+                },
+                synchronize_session=False,
+            )
+            db.session.commit()
+            events.publish(
+                "feed", "pin_comments", id=pin.id, comment_count=pin.comment_count
+            )
+            return jsonify({"ok": True, "comment": comment_json(c, {c.user_id: current_user.username})})
+
+        # GET; comments are only ever added, so the count is a version stamp
+        # (per page, order and thread: the arguments are part of it)
+        etag = http_cache.version_etag(
+            pin.id, sorted(request.args.items(multi=True)), pin.comment_count
+        )
+        if http_cache.is_fresh(etag):
+            return http_cache.not_modified(etag)
+
+        parent_id = request.args.get("parent", type=int)
+        if parent_id is not None:
+            query = Comment.query.filter_by(parent_id=parent_id, pin_id=pin.id)
+            oldest_first = True
+        else:
+            query = Comment.query.filter_by(pin_id=pin.id, parent_id=None)
+            oldest_first = request.args.get("order") == "oldest"
+        try:
+            comments, next_cursor = keyset_page(
+                query, Comment.created_at, Comment.id,
+                cursor=request.args.get("cursor"),
+                limit=page_size(request.args.get("limit")),
+                oldest_first=oldest_first,
+            )
+        except ValueError as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
+
+        # one query for the page's authors, only the columns shown
+        authors = dict(db.session.execute(
+            select(User.id, User.username).where(User.id.in_({c.user_id for c in comments}))
+        ).all()) if comments else {}
+        return http_cache.with_etag(jsonify({
+            "comments": [comment_json(c, authors) for c in comments],
+            "next_cursor": next_cursor,
+            "comment_count": pin.comment_count,
+        }), etag)
+
+    # ---------- METRICS ----------
+
+    def metrics_allowed():
+        """Bearer METRICS_TOKEN; with no token set, only where METRICS_OPEN allows it."""
+        token = app.config["METRICS_TOKEN"]
+        if not token:
+            return app.config["METRICS_OPEN"] or app.testing
+        return hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        )
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        """Prometheus scrape target; needs METRICS_TOKEN outside development."""
+        if not metrics_allowed():
+            abort(404 if not app.config["METRICS_TOKEN"] else 401)
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/metrics/slow-queries")
+    def slow_queries():
+        """The most recent statements slower than SLOW_QUERY_MS, newest last."""
+        if not metrics_allowed():
+            abort(404 if not app.config["METRICS_TOKEN"] else 401)
+        return jsonify({"slow_queries": metrics.slow_queries()})
+
+    # ---------- CLI ----------
+
+    @app.cli.command("backfill-counters")
+    def backfill_counters_command():
+        """Recompute denormalized like/save/comment counters on every pin."""
+        updated = backfill_pin_counters()
+        print(f"Backfilled counters on {updated} pins.")
+
+    @app.cli.command("worker")
+    @click.option("--concurrency", type=int, default=None,
+                  help="Parallel jobs; defaults to the number of CPU cores.")
+    @click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+    def worker_command(concurrency, once):
+        """Run background jobs (image processing) until interrupted."""
+        run_worker(app, concurrency=concurrency, once=once)
+
+    @app.cli.command("build-thumbnails")
+    def build_thumbnails_command():
+        """Queue image processing for pins uploaded before the pipeline existed."""
+        pins = Pin.query.filter(
+            Pin.variants.is_(None), Pin.processing_state == "ready"
+        ).all()
+        for pin in pins:
+            pin.processing_state = "pending"
+            enqueue("process_pin_image", pin_id=pin.id)
+        db.session.commit()
+        print(f"Queued {len(pins)} pins; run `flask worker` to process them.")
+
+    @app.cli.command("prune-uploads")
+    def prune_uploads_command():
+        """Remove chunked uploads left unfinished for UPLOAD_EXPIRY_HOURS."""
+        removed = uploads.prune(
+            app.config["UPLOAD_FOLDER"], timedelta(hours=app.config["UPLOAD_EXPIRY_HOURS"])
+        )
+        print(f"Removed {removed} unfinished uploads.")
+
+    @app.cli.command("build-board-covers")
+    def build_board_covers_command():
+        """Queue cover collages for boards that have pins but no cover."""
+        ids = [
+            bid for (bid,) in db.session.query(Board.id).filter(
+                Board.pin_count > 0, Board.cover_filename.is_(None)
+            )
+        ]
+        for board_id in ids:
+            enqueue("build_board_cover", board_id=board_id)
+        db.session.commit()
+        print(f"Queued {len(ids)} boards; run `flask worker` to build the covers.")
+
+    @app.cli.command("build-related")
+    @click.option("--top-k", type=int, default=related.TOP_K, show_default=True,
+                  help="Neighbours stored per pin.")
+    def build_related_command(top_k):
+        """Recompute "more like this" pins (needs numpy and scipy)."""
+        started = time.perf_counter()
+        pins, rows = related.build(top_k=top_k)
+        print(f"Stored {rows} related pins for {pins} pins "
+              f"in {time.perf_counter() - started:.1f}s.")
+
+    @app.cli.command("backfill-trending")
+    def backfill_trending_command():
+        """Recompute trending scores from all likes, saves and comments."""
+        scored = trending.backfill()
+        print(f"Scored {scored} pins.")
+
+    @app.cli.command("bench-trending")
+    @click.option("--volumes", default="1000,10000,100000", show_default=True,
+                  help="Comma-separated event counts to measure.")
+    def bench_trending_command(volumes):
+        """Time trending updates and /api/explore reads as event volume grows."""
+        from .benchmarks import trending_benchmark
+
+        print(f"{'events':>8} {'update us':>10} {'explore ms':>11} {'deep page ms':>13} "
+              f"{'group-by ms':>12}")
+        for r in trending_benchmark([int(v) for v in volumes.split(",")]):
+            print(f"{r['events']:>8} {r['update_us']:>10.1f} {r['explore_ms']:>11.2f} "
+                  f"{r['deep_page_ms']:>13.2f} {r['group_by_ms']:>12.2f}")
+
+    @app.cli.command("seed")
+    @click.option("--users", type=int, default=1000, show_default=True)
+    @click.option("--pins", type=int, default=10000, show_default=True)
+    @click.option("--likes", type=int, default=100000, show_default=True)
+    @click.option("--saves", type=int, default=20000, show_default=True)
+    @click.option("--comments", type=int, default=20000, show_default=True)
+    @click.option("--messages", type=int, default=20000, show_default=True)
+    @click.option("--days", type=int, default=90, show_default=True,
+                  help="Spread the activity over this many past days.")
+    @click.option("--seed", "seed_value", type=int, default=1, show_default=True,
+                  help="Same seed, same data.")
+    def seed_command(users, pins, likes, saves, comments, messages, days, seed_value):
+        """Bulk-generate skewed synthetic users, pins and activity."""
+        from .seed import SEED_PASSWORD, seed
+
+        started = time.perf_counter()
+        seed(app.config["UPLOAD_FOLDER"], users=users, pins=pins, likes=likes, saves=saves,
+             comments=comments, messages=messages, days=days, seed=seed_value)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s; "
+              f"users log in as seed<id>@example.com / {SEED_PASSWORD}.")
+
+    @app.cli.command("bench")
+    @click.option("--url", default=None,
+                  help="Benchmark a running server instead of the in-process test client.")
+    @click.option("--concurrency", type=int, default=4, show_default=True)
+    @click.option("--requests", "n_requests", type=int, default=200, show_default=True,
+                  help="Requests per scenario, split across the threads.")
+    @click.option("--scenario", "scenarios", multiple=True,
+                  type=click.Choice(["api_pins", "messages_for", "like", "dashboard"]),
+                  help="Repeat to pick; all by default.")
+    @click.option("--output", type=click.Path(dir_okay=False),
+                  help="Save the results as JSON.")
+    @click.option("--baseline", type=click.Path(exists=True, dir_okay=False),
+                  help="Earlier --output file to compare against.")
+    def bench_command(url, concurrency, n_requests, scenarios, output, baseline):
+        """p50/p99 latency and queries per request for the hot endpoints."""
+        from .benchmarks import SCENARIOS, endpoint_suite
+
+        results = endpoint_suite(app, base_url=url, concurrency=concurrency,
+                                 requests=n_requests, scenarios=scenarios or SCENARIOS)
+        before = {}
+        if baseline:
+            with open(baseline) as f:
+                before = json.load(f)["results"]
+
+        print(f"{'scenario':<14} {'reqs':>5} {'err':>4} {'rps':>7} {'p50 ms':>8} "
+              f"{'p99 ms':>8} {'queries':>8}")
+        for name, r in results.items():
+            queries = "-" if r["queries_per_request"] is None else f"{r['queries_per_request']:.1f}"
+            print(f"{name:<14} {r['requests']:>5} {r['errors']:>4} {r['rps']:>7.1f} "
+                  f"{r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {queries:>8}")
+            old = before.get(name)
+            if old:
+                print(f"{'  vs baseline':<14} {'':>5} {'':>4} {r['rps'] - old['rps']:>+7.1f} "
+                      f"{r['p50_ms'] - old['p50_ms']:>+8.2f} {r['p99_ms'] - old['p99_ms']:>+8.2f}")
+
+        if output:
+            with open(output, "w") as f:
+                json.dump({
+                    "concurrency": concurrency, "requests": n_requests,
+                    "target": url or "test-client", "results": results,
+                }, f, indent=2)
+            print(f"Saved to {output}.")
+
+    @app.cli.command("backfill-tags")
+    def backfill_tags_command():
+        """Build pin_tags rows from the Pin.tags text of older pins."""
+        tagged = backfill_tags()
+        print(f"Tagged {tagged} pins.")
+
+    @app.cli.command("check-query-plans")
+    def check_query_plans_command():
+        """Fail if any route's queries scan a whole table (SQLite plans)."""
+        from .queryplan import check
+
+        migrations_dir = os.path.join(os.path.dirname(app.root_path), "migrations")
+        problems = check(migrations_dir)
+        for statement, detail in problems:
+            print(f"{detail}\n    {' '.join(statement.split())}\n")
+        if problems:
+            raise SystemExit(1)
+        print("No full table scans.")
+
+    @app.cli.command("check-query-counts")
+    def check_query_counts_command():
+        """Fail if a page's SQL statement count grows with its row count."""
+        from .querycount import SMALL, LARGE, check
+
+        problems = check()
+        for url, small, large in problems:
+            print(f"{url}: {small} statements for {SMALL} rows, {large} for {LARGE}")
+        if problems:
+            raise SystemExit(1)
+        print("Statement counts don't grow with the data.")
+
+    @app.cli.command("check-sessions")
+    def check_sessions_command():
+        """Fail if a cached login outlives a password or profile change."""
+        from .sessioncheck import check
+
+        problems = check()
+        for problem in problems:
+            print(problem)
+        if problems:
+            raise SystemExit(1)
+        print("Sessions follow password and profile changes.")
+
+    @app.cli.command("load-test")
+    @click.option("--threads", type=int, default=8, help="Concurrent writers.")
+    @click.option("--seconds", type=float, default=10.0, help="Duration of each round.")
+    @click.option("--database-url", default=None,
+                  help="Scratch database to write to; default compares tuned and "
+                       "untuned SQLite on temporary files.")
+    def load_test_command(threads, seconds, database_url):
+        """Measure like/message write throughput under contention."""
+        from .loadtest import run, run_sqlite_comparison
+
+        if database_url:
+            rounds = {"configured": run(database_url, threads=threads, seconds=seconds)}
+        else:
+            rounds = run_sqlite_comparison(threads=threads, seconds=seconds)
+        for label, stats in rounds.items():
+            print(
+                f"{label:>10}: {stats['ops']} writes, {stats['ops_per_sec']:.0f}/s, "
+                f"{stats['errors']} errors, p50 {stats['p50_ms']:.1f} ms, "
+                f"p95 {stats['p95_ms']:.1f} ms"
+            )
 
     return app
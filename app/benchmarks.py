@@ -0,0 +1,275 @@
+"""Benchmarks, run from the CLI.
+
+`flask bench-trending` seeds a throwaway SQLite file per event volume.
+`flask bench` drives the hot endpoints against the configured database
+(fill it with `flask seed` first) and can save its results as JSON to
+compare one commit against another. Numbers compare runs on one machine;
+they are not absolute.
+"""
+import http.cookiejar
+import math
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, update
+
+SAMPLE_UPDATES = 500
+READ_REPEAT = 20
+DEEP_PAGE = 10
+
+
+def _mean_seconds(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def _seed_trending(events, rng):
+    """Users, pins and `events` likes from the last week, scored like the app does."""
+    from . import db, trending
+    from .models import Like, Pin, User
+
+    n_pins = max(100, events // 10)
+    n_users = max(200, events // n_pins * 4)
+    now = datetime.utcnow()
+    db.create_all()
+    # the extra users make the timed likes that follow
+    db.session.execute(insert(User), [
+        {"username": f"bench{i}", "email": f"bench{i}@example.com", "password_hash": "-"}
+        for i in range(n_users + SAMPLE_UPDATES)
+    ])
+    db.session.execute(insert(Pin), [
+        {"title": f"bench pin {i}", "image_filename": "bench.jpg", "user_id": 1,
+         "created_at": now - timedelta(minutes=i)}
+        for i in range(n_pins)
+    ])
+
+    # distinct (user, pin) pairs, skewed towards low pin ids like real popularity
+    pairs = set()
+    while len(pairs) < events:
+        pin = min(int(rng.paretovariate(1.2)), n_pins)
+        pairs.add((rng.randint(1, n_users), pin))
+    likes = [
+        {"user_id": u, "pin_id": p, "created_at": now - timedelta(seconds=rng.randint(0, 7 * 86400))}
+        for u, p in pairs
+    ]
+    db.session.execute(insert(Like), likes)
+
+    scores = {}
+    for like in likes:
+        scores[like["pin_id"]] = scores.get(like["pin_id"], 0.0) + trending.contribution(
+            "like", like["created_at"]
+        )
+    db.session.execute(update(Pin), [
+        {"id": pid, "trending_score": s} for pid, s in scores.items()
+    ])
+    db.session.commit()
+    return n_users, n_pins
+
+
+def trending_benchmark(volumes, seed=1):
+    """Per event volume: mean cost of one like (its own transaction, as in
+    like_pin), of the first and a deep /api/explore page, and of ranking by
+    a GROUP BY over the like table instead of the stored score."""
+    from . import create_app, db, trending
+    from .models import Like, Pin
+    from .pagination import score_page
+
+    rng = random.Random(seed)
+    results = []
+    for events in volumes:
+        tmp = tempfile.mkdtemp()
+        try:
+            app = create_app(
+                SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(tmp, "bench.db"),
+                UPLOAD_FOLDER=os.path.join(tmp, "uploads"),
+            )
+            with app.app_context():
+                n_users, n_pins = _seed_trending(events, rng)
+
+                def explore(cursor=None):
+                    query = Pin.query.filter(Pin.processing_state != "failed")
+                    return score_page(query, Pin.trending_score, Pin.id, cursor=cursor, limit=30)
+
+                cursor = None
+                for _ in range(DEEP_PAGE):
+                    cursor = explore(cursor)[1]
+
+                started = time.perf_counter()
+                for i in range(SAMPLE_UPDATES):
+                    pin_id = rng.randint(1, n_pins)
+                    # a user with no likes yet, so it never collides with a seeded one
+                    db.session.add(Like(user_id=n_users + 1 + i, pin_id=pin_id))
+                    Pin.query.filter_by(id=pin_id).update({
+                        Pin.like_count: Pin.like_count + 1,
+                        Pin.trending_score: Pin.trending_score + trending.contribution("like"),
+                    }, synchronize_session=False)
+                    db.session.commit()
+                update_s = (time.perf_counter() - started) / SAMPLE_UPDATES
+
+                group_by = (
+                    select(Like.pin_id, func.count())
+                    .group_by(Like.pin_id)
+                    .order_by(func.count().desc())
+                    .limit(30)
+                )
+                results.append({
+                    "events": events,
+                    "update_us": update_s * 1e6,
+                    "explore_ms": _mean_seconds(explore, READ_REPEAT) * 1000,
+                    "deep_page_ms": _mean_seconds(lambda: explore(cursor), READ_REPEAT) * 1000,
+                    "group_by_ms": _mean_seconds(
+                        lambda: db.session.execute(group_by).all(), READ_REPEAT
+                    ) * 1000,
+                })
+                db.engine.dispose()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+# ---- hot-endpoint suite (`flask bench`) ----
+
+SCENARIOS = ("api_pins", "messages_for", "like", "dashboard")
+_QUERIES_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+class _TestClientSession:
+    """A logged-in Flask test client (in-process, no network)."""
+
+    def __init__(self, app, email, password):
+        self.client = app.test_client()
+        # a fresh app context: under the CLI one is already pushed, and its
+        # `g` would still hold the user the previous session logged in as
+        with app.app_context():
+            self.client.post("/login", data={"email": email, "password": password})
+
+    def request(self, method, path):
+        response = self.client.open(path, method=method)
+        response.get_data()
+        return response.status_code, response.headers.get("Server-Timing", "")
+
+
+class _HttpSession:
+    """A logged-in cookie session against a running server."""
+
+    def __init__(self, base_url, email, password):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+        form = urllib.parse.urlencode({"email": email, "password": password}).encode()
+        self.opener.open(self.base_url + "/login", data=form).read()
+
+    def request(self, method, path):
+        req = urllib.request.Request(self.base_url + path, method=method,
+                                     data=b"" if method == "POST" else None)
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                return response.status, response.headers.get("Server-Timing", "")
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get("Server-Timing", "")
+
+
+def _request_for(scenario, ctx, rng):
+    if scenario == "api_pins":
+        return "GET", "/api/pins?limit=30"
+    if scenario == "messages_for":
+        return "GET", f"/api/messages_for/{ctx['partner_id']}"
+    if scenario == "like":
+        return "POST", f"/pin/{rng.randint(*ctx['pin_range'])}/like"
+    return "GET", "/dashboard"
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def endpoint_suite(app, base_url=None, concurrency=4, requests=200,
+                   scenarios=SCENARIOS, password=None, seed=1):
+    """Drive the hot endpoints and return {scenario: stats}.
+
+    Runs against `app` through the test client, or against a server at
+    `base_url`. Each of `concurrency` threads logs in as a different
+    seeded user who has a conversation (see app/seed.py) and sends its
+    share of `requests` per scenario. Queries per request come from the
+    Server-Timing header, so they are None when SERVER_TIMING is off.
+    """
+    from . import db
+    from .models import Conversation, Pin, User
+    from .seed import SEED_PASSWORD
+
+    with app.app_context():
+        rows = db.session.execute(
+            db.select(User.email, Conversation.user_b_id)
+            .join(User, User.id == Conversation.user_a_id)
+            .where(User.email.like("seed%"))
+            .order_by(Conversation.id)
+            .limit(concurrency)
+        ).all()
+        pin_range = db.session.execute(db.select(func.min(Pin.id), func.max(Pin.id))).one()
+    if len(rows) < concurrency or pin_range[0] is None:
+        raise RuntimeError("Not enough seeded data; run `flask seed` first.")
+
+    contexts = [
+        {"email": email, "partner_id": partner_id, "pin_range": tuple(pin_range)}
+        for email, partner_id in rows
+    ]
+    sessions = [
+        _HttpSession(base_url, c["email"], password or SEED_PASSWORD) if base_url
+        else _TestClientSession(app, c["email"], password or SEED_PASSWORD)
+        for c in contexts
+    ]
+
+    results = {}
+    for scenario in scenarios:
+        samples, errors = [], []
+
+        def worker(index):
+            rng = random.Random(seed * 1000 + index)
+            session, ctx = sessions[index], contexts[index]
+            mine, failed = [], 0
+            for _ in range(requests // concurrency):
+                method, path = _request_for(scenario, ctx, rng)
+                started = time.perf_counter()
+                status, server_timing = session.request(method, path)
+                elapsed = time.perf_counter() - started
+                match = _QUERIES_RE.search(server_timing)
+                mine.append((elapsed, int(match.group(1)) if match else None))
+                if status >= 300:  # the hot endpoints answer 200; a redirect means a lost login
+                    failed += 1
+            samples.extend(mine)
+            errors.append(failed)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+
+        latencies = sorted(s for s, _ in samples)
+        queries = [q for _, q in samples if q is not None]
+        results[scenario] = {
+            "requests": len(samples),
+            "errors": sum(errors),
+            "rps": len(samples) / wall if wall else 0.0,
+            "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+            "queries_per_request": sum(queries) / len(queries) if queries else None,
+        }
+    return results
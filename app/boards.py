@@ -0,0 +1,93 @@
+"""Board membership, with a cached pin count and a precomputed cover.
+
+Board lists read nothing but board rows: pin_count is kept in step by
+add_pins/remove_pins, and the cover is one collage image of the newest
+pins (images.render_collage), rebuilt by the build_board_cover job after
+membership changes.
+"""
+from sqlalchemy import delete, insert, select
+
+from . import db, storage
+from .images import COVER_TILES, variant_filename
+from .models import Board, Pin, board_pins
+
+# ids accepted per call to the bulk endpoint
+MAX_BULK_PINS = 500
+
+
+def add_pins(board, pin_ids):
+    """Add the pins of `pin_ids` that exist and aren't on `board` yet.
+
+    Inserts them with one executemany and returns how many were added.
+    Call before the surrounding commit.
+    """
+    wanted = set(pin_ids)
+    if not wanted:
+        return 0
+    present = set(db.session.scalars(
+        select(board_pins.c.pin_id).where(
+            board_pins.c.board_id == board.id, board_pins.c.pin_id.in_(wanted)
+        )
+    ))
+    new_ids = sorted(db.session.scalars(select(Pin.id).where(Pin.id.in_(wanted - present))))
+    if not new_ids:
+        return 0
+    db.session.execute(
+        insert(board_pins), [{"board_id": board.id, "pin_id": pid} for pid in new_ids]
+    )
+    Board.query.filter_by(id=board.id).update(
+        {Board.pin_count: Board.pin_count + len(new_ids)}, synchronize_session=False
+    )
+    return len(new_ids)
+
+
+def remove_pins(board, pin_ids):
+    """Take the pins of `pin_ids` off `board`; returns how many were removed."""
+    if not pin_ids:
+        return 0
+    removed = db.session.execute(
+        delete(board_pins).where(
+            board_pins.c.board_id == board.id, board_pins.c.pin_id.in_(set(pin_ids))
+        )
+    ).rowcount
+    if removed:
+        Board.query.filter_by(id=board.id).update(
+            {Board.pin_count: Board.pin_count - removed}, synchronize_session=False
+        )
+    return removed
+
+
+def delete_board(board):
+    """Delete `board` and its memberships.
+
+    Returns the cover filename if this was its last reference; the caller
+    deletes the file (storage.delete_unused) after committing.
+    """
+    unused = None
+    if board.cover_filename and storage.release(board.cover_filename):
+        unused = board.cover_filename
+    db.session.execute(delete(board_pins).where(board_pins.c.board_id == board.id))
+    db.session.delete(board)
+    return unused
+
+
+def cover_sources(board_id):
+    """Upload-relative paths of the images to tile into a board's cover.
+
+    The newest processed pins, using their smallest resized variant.
+    """
+    pins = db.session.scalars(
+        select(Pin)
+        .join(board_pins, board_pins.c.pin_id == Pin.id)
+        .where(board_pins.c.board_id == board_id, Pin.processing_state == "ready")
+        .order_by(board_pins.c.pin_id.desc())
+        .limit(COVER_TILES)
+    )
+    sources = []
+    for pin in pins:
+        if pin.variants:
+            stem = pin.image_filename.rsplit(".", 1)[0]
+            sources.append(variant_filename(stem, pin.variants.split(",")[0]))
+        else:
+            sources.append(pin.image_filename)
+    return sources
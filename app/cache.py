@@ -0,0 +1,171 @@
+"""Per-user integer id sets (liked pins, saved pins) cached between requests.
+
+Each set is loaded from the database once, kept for CACHE_TTL seconds and
+dropped as soon as the user changes it. Callers only ask which of a page's
+pin ids are members, so the per-request cost doesn't grow with a user's
+history. A set with more than CACHE_MAX_IDS ids isn't cached; for such a
+user each page asks the database about its own ids instead.
+
+The default backend is an in-process LRU. Every worker process has its
+own, so with more than one worker set CACHE_URL to a Redis-compatible
+server (redis://localhost:6379/1) so invalidations reach all of them.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # optional, only needed for CACHE_URL
+    redis = None
+
+
+class LocalBackend:
+    """LRU of sorted int arrays; 8 bytes per id instead of a Python set's ~60."""
+
+    def __init__(self, ttl, max_ids, max_entries=10000):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, array, or None if too big)
+        self._ttl = ttl
+        self._max_ids = max_ids
+        self._max_entries = max_entries
+        self._epoch = 0  # bumped by invalidate()
+
+    def _get(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            epoch = self._epoch
+        ids = _load_bounded(loader, self._max_ids)
+        if ids is not None:
+            ids = array("q", sorted(ids))
+        with self._lock:
+            if epoch != self._epoch:
+                # something was invalidated while we loaded; don't cache
+                # a set that may predate that write
+                return ids
+            self._entries[key] = (now + self._ttl, ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return ids
+
+    def members(self, key, loader, candidates):
+        candidates = list(candidates)
+        ids = self._get(key, loader)
+        if ids is None:
+            return set(loader(within=candidates)) if candidates else set()
+        found = set()
+        for c in candidates:
+            i = bisect_left(ids, c)
+            if i < len(ids) and ids[i] == c:
+                found.add(c)
+        return found
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._epoch += 1
+
+
+class RedisBackend:
+    """Redis sets shared by all workers; membership via one SMISMEMBER.
+
+    invalidate() bumps a generation counter next to each set. A worker
+    filling a missing set reads the counter before running the loader and
+    writes the set only if the counter is unchanged (WATCH/MULTI), so a
+    set loaded before a like can't be stored after that like's
+    invalidation.
+    """
+
+    prefix = "pinboard:ids:"
+    generation_prefix = "pinboard:ids-gen:"
+    # redis can't store an empty set, so every set holds this non-id
+    _PLACEHOLDER = 0
+    # held instead of the ids by a set too big to cache
+    _TOO_BIG = -1
+
+    def __init__(self, url, ttl, max_ids):
+        if redis is None:
+            raise RuntimeError("CACHE_URL is set but the redis package is not installed.")
+        self._client = redis.Redis.from_url(url)
+        self._ttl = ttl
+        self._max_ids = max_ids
+
+    def members(self, key, loader, candidates):
+        name = self.prefix + key
+        candidates = list(candidates)
+        if not self._client.exists(name):
+            return self._fill(key, loader, candidates)
+        if not candidates:
+            return set()
+        flags = self._client.smismember(name, [self._TOO_BIG, *candidates])
+        if flags[0]:
+            return set(loader(within=candidates))
+        return {c for c, hit in zip(candidates, flags[1:]) if hit}
+
+    def _fill(self, key, loader, candidates):
+        name, generation_name = self.prefix + key, self.generation_prefix + key
+        generation = self._client.get(generation_name)
+        ids = _load_bounded(loader, self._max_ids)
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(generation_name)
+                if pipe.get(generation_name) == generation:
+                    pipe.multi()
+                    members = ids if ids is not None else (self._TOO_BIG,)
+                    pipe.sadd(name, self._PLACEHOLDER, *members)
+                    pipe.expire(name, self._ttl)
+                    pipe.execute()
+            except redis.WatchError:
+                pass  # invalidated while we loaded; answer from `ids`, uncached
+        if ids is None:
+            return set(loader(within=candidates)) if candidates else set()
+        return ids.intersection(candidates)
+
+    def invalidate(self, key):
+        generation_name = self.generation_prefix + key
+        pipe = self._client.pipeline()
+        pipe.incr(generation_name)
+        pipe.expire(generation_name, self._ttl)
+        pipe.delete(self.prefix + key)
+        pipe.execute()
+
+
+def _load_bounded(loader, max_ids):
+    """The whole set from `loader`, or None if it has more than `max_ids`."""
+    ids = set(loader(limit=max_ids + 1))
+    return ids if len(ids) <= max_ids else None
+
+
+class IdSetCache:
+    """Flask extension wrapping the configured cache backend."""
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get("CACHE_URL")
+        ttl = app.config.get("CACHE_TTL", 60)
+        max_ids = app.config.get("CACHE_MAX_IDS", 5000)
+        self.backend = RedisBackend(url, ttl, max_ids) if url else LocalBackend(ttl, max_ids)
+        app.extensions["id_set_cache"] = self
+
+    def members(self, key, loader, candidates):
+        """The subset of `candidates` in the set `key`.
+
+        `loader(limit=None, within=None)` returns the set's ids, at most
+        `limit` of them, or only those in `within`. It runs with `limit` on
+        a cache miss and with `within` for a set too big to cache.
+        """
+        return self.backend.members(key, loader, candidates)
+
+    def invalidate(self, key):
+        self.backend.invalidate(key)
@@ -0,0 +1,76 @@
+"""Config profiles, picked by APP_PROFILE (development by default).
+
+    APP_PROFILE=production DATABASE_URL=postgresql://... flask --app run run
+
+Every value can also be overridden through the environment variable of
+the same name where one is read below.
+"""
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-me")
+    # for dev; can be changed to Postgres later
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///app.db")
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB, also the limit for chunked uploads
+    # unfinished chunked uploads are removed by `flask prune-uploads` after this
+    UPLOAD_EXPIRY_HOURS = _env_int("UPLOAD_EXPIRY_HOURS", 24)
+
+    # e.g. redis://localhost:6379/0 to share live events across workers
+    PUBSUB_URL = os.environ.get("PUBSUB_URL")
+    # liked/saved id sets; set CACHE_URL when running several workers
+    CACHE_URL = os.environ.get("CACHE_URL")
+    CACHE_TTL = _env_int("CACHE_TTL", 60)
+    # users with more likes/saves than this are looked up per page instead
+    CACHE_MAX_IDS = _env_int("CACHE_MAX_IDS", 5000)
+    # logged-in users, per worker process (app/identity.py); 0 turns it off
+    USER_CACHE_TTL = _env_int("USER_CACHE_TTL", 30)
+    USER_CACHE_SIZE = _env_int("USER_CACHE_SIZE", 10000)
+
+    # trending scores (app/trending.py); run `flask backfill-trending` after changing
+    TRENDING_EPOCH = os.environ.get("TRENDING_EPOCH", "2026-01-01T00:00:00")
+    TRENDING_HALF_LIFE_HOURS = _env_int("TRENDING_HALF_LIFE_HOURS", 48)
+
+    # app/metrics.py: Server-Timing header, slow-query threshold, /metrics auth
+    SERVER_TIMING = True
+    SLOW_QUERY_MS = _env_int("SLOW_QUERY_MS", 200)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    # without a token the endpoints are served only when this is on; they
+    # include raw SQL, so it is off everywhere but development
+    METRICS_OPEN = False
+
+    # SQLite, applied on every new connection (app/database.py)
+    SQLITE_TUNING = True  # WAL journal, synchronous=NORMAL, busy timeout, mmap
+    SQLITE_BUSY_TIMEOUT_MS = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+    SQLITE_MMAP_SIZE = _env_int("SQLITE_MMAP_SIZE", 64 * 1024 * 1024)
+
+    # Postgres connection pool, per worker process
+    DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+    DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)  # seconds
+    DB_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 0)  # 0 = no limit
+
+
+class DevelopmentConfig(Config):
+    METRICS_OPEN = True
+
+
+class ProductionConfig(Config):
+    # query counts and DB time are for developers, not every visitor
+    SERVER_TIMING = os.environ.get("SERVER_TIMING") == "1"
+    SQLITE_MMAP_SIZE = _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+    DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 10)
+    DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 20)
+    # a runaway query should fail the request, not pin a connection
+    DB_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 5000)
+
+
+PROFILES = {
+    "development": DevelopmentConfig,
+    "production": ProductionConfig,
+}
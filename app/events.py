@@ -0,0 +1,99 @@
+"""In-process pub/sub used to push live updates to /api/stream clients.
+
+Every gunicorn/werkzeug worker has its own LocalBackend, so with more than
+one worker process set PUBSUB_URL to a Redis-compatible server
+(redis://localhost:6379/0) and events fan out across all of them.
+"""
+import json
+import queue
+import threading
+
+try:
+    import redis
+except ImportError:  # optional, only needed for PUBSUB_URL
+    redis = None
+
+
+class LocalBackend:
+    """Fan-out to subscribers living in this process."""
+
+    def __init__(self, max_pending=100):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> set of queues
+        self._max_pending = max_pending
+
+    def publish(self, channel, payload):
+        with self._lock:
+            queues = list(self._subscribers.get(channel, ()))
+        for q in queues:
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                # slow client; it will resync on its next reconnect
+                pass
+
+    def listen(self, channels, timeout):
+        q = queue.Queue(maxsize=self._max_pending)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(q)
+        try:
+            while True:
+                try:
+                    yield q.get(timeout=timeout)
+                except queue.Empty:
+                    yield None
+        finally:
+            with self._lock:
+                for channel in channels:
+                    subs = self._subscribers.get(channel)
+                    if subs:
+                        subs.discard(q)
+                        if not subs:
+                            del self._subscribers[channel]
+
+
+class RedisBackend:
+    """Fan-out through a Redis-compatible server, shared by all workers."""
+
+    prefix = "pinboard:"
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("PUBSUB_URL is set but the redis package is not installed.")
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, channel, payload):
+        self._client.publish(self.prefix + channel, payload)
+
+    def listen(self, channels, timeout):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*[self.prefix + c for c in channels])
+        try:
+            while True:
+                message = pubsub.get_message(timeout=timeout)
+                yield message["data"].decode() if message else None
+        finally:
+            pubsub.close()
+
+
+class EventHub:
+    """Flask extension wrapping the configured pub/sub backend."""
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get("PUBSUB_URL")
+        self.backend = RedisBackend(url) if url else LocalBackend()
+        app.extensions["event_hub"] = self
+
+    def publish(self, channel, event_type, **data):
+        data["type"] = event_type
+        self.backend.publish(channel, json.dumps(data))
+
+    def listen(self, channels, timeout=15):
+        """Yield raw JSON payloads, or None every `timeout` seconds of silence."""
+        return self.backend.listen(channels, timeout)
@@ -0,0 +1,46 @@
+"""Conditional GETs for the polled JSON APIs, and cache headers for uploads.
+
+API views compute a weak ETag from a cheap version stamp (max id /
+updated_at of what they are about to return, plus the request arguments
+and viewer) and answer 304 before running the real queries or building
+JSON. Responses are `private, no-cache`: browsers keep them but must
+revalidate, which is exactly one cheap round trip per poll.
+"""
+import hashlib
+import re
+
+from flask import Response, request
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "private, no-cache"
+
+# uploads named by a uuid4 hex or a SHA-256 (and their _236.webp variants)
+# are never rewritten, so browsers and CDNs may keep them forever
+_IMMUTABLE_UPLOAD_RE = re.compile(
+    r"^uploads/(?:[^/]+/)*(?:[0-9a-f]{32}|[0-9a-f]{64})(?:_[^/.]+)?\.\w+$"
+)
+
+
+def version_etag(*parts):
+    """Opaque ETag value for a version stamp made of `parts`."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+
+
+def is_fresh(etag):
+    """True if the client's If-None-Match already has `etag`."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    return with_etag(response, etag)
+
+
+def with_etag(response, etag):
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = REVALIDATE
+    return response
+
+
+def is_immutable_upload(filename):
+    return bool(_IMMUTABLE_UPLOAD_RE.match(filename or ""))
@@ -0,0 +1,112 @@
+"""Logged-in users cached between requests, so load_user skips the database.
+
+Every authenticated request, including each chat and feed poll, used to
+load the user row by primary key. The cache keeps that row for
+USER_CACHE_TTL seconds, keyed by user id plus the session version stamp
+that User.get_id() puts in the session cookie. Changing the password bumps
+User.session_version, so sessions from before the change no longer match
+the database row and are logged out. Any commit that changes or deletes a
+cached user's row drops that entry, so this worker sees the new version
+(or profile) on the next request.
+
+The cache is an in-process LRU. With several worker processes, the other
+workers keep serving the old row until their copy expires, so keep the TTL
+short.
+
+Cached rows are detached from any session. `load` merges the cached row
+into the current request's session without a query, so lazy relationships
+and `author=current_user` work as they would on a freshly loaded row.
+"""
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+
+
+def parse_session_id(value):
+    """(user id, session version) from User.get_id(). Cookies set before
+    versions existed carry the bare id and count as version 0."""
+    user_id, _, version = value.partition(":")
+    return int(user_id), int(version or 0)
+
+
+class IdentityCache:
+    """Flask extension: an LRU of detached User rows with a TTL."""
+
+    def __init__(self, app=None, db=None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user id -> (expires_at, version, user)
+        self._epoch = 0  # bumped by invalidate()
+        self._models = set()  # classes load() has been asked for
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.db = db
+        self.ttl = app.config.get("USER_CACHE_TTL", 30)
+        self.max_entries = app.config.get("USER_CACHE_SIZE", 10000)
+        app.extensions["identity_cache"] = self
+        if not event.contains(db.session, "after_flush", self._note_changes):
+            event.listen(db.session, "after_flush", self._note_changes)
+            event.listen(db.session, "after_commit", self._drop_changed)
+            event.listen(db.session, "after_rollback", self._forget_changes)
+
+    def load(self, model, session_id):
+        """The user for `session_id` (User.get_id()), or None if the user is
+        gone or the session predates a password change."""
+        try:
+            user_id, version = parse_session_id(session_id)
+        except ValueError:
+            return None
+
+        self._models.add(model)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now and entry[1] == version:
+                self._entries.move_to_end(user_id)
+                return self.db.session.merge(entry[2], load=False)
+            epoch = self._epoch
+
+        user = self.db.session.get(model, user_id)
+        if user is None or user.session_version != version:
+            return None
+        if self.ttl > 0:
+            self._store(user_id, version, user, now, epoch)
+        return user
+
+    def _store(self, user_id, version, user, now, epoch):
+        # a detached copy with the columns loaded, never expired by this
+        # request's commits; the request keeps using `user` itself
+        detached = type(user)(**{c.key: getattr(user, c.key) for c in user.__table__.columns})
+        make_transient_to_detached(detached)
+        with self._lock:
+            if epoch != self._epoch:
+                # invalidated while we loaded; the row may predate that write
+                return
+            self._entries[user_id] = (now + self.ttl, version, detached)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._epoch += 1
+
+    def _note_changes(self, session, flush_context):
+        # users updated or deleted by this flush; dropped once the commit lands
+        changed = session.info.setdefault("identity_changed", set())
+        for obj in chain(session.dirty, session.deleted):
+            if type(obj) in self._models:
+                changed.add(obj.id)
+
+    def _drop_changed(self, session):
+        for user_id in session.info.pop("identity_changed", ()):
+            self.invalidate(user_id)
+
+    def _forget_changes(self, session):
+        session.info.pop("identity_changed", None)
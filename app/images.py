@@ -0,0 +1,167 @@
+"""Resized variants and display metadata for uploaded images.
+
+Every upload gets WebP copies (JPEG when Pillow was built without WebP)
+at the feed's column widths, so the masonry grid never downloads the
+original. Variants live in uploads/thumbs/ and are listed on the pin as
+e.g. "236.webp,474.webp,736.webp".
+"""
+import os
+import tempfile
+
+from PIL import Image, ImageOps, features
+
+from .storage import INCOMING_DIR, stage
+
+# card widths at 1x, 2x and the pin modal
+VARIANT_WIDTHS = (236, 474, 736)
+THUMB_DIR = "thumbs"
+# board covers are a 2x2 grid of square tiles at the smallest card width
+COVER_TILES = 4
+COVER_TILE_SIZE = VARIANT_WIDTHS[0]
+COVER_BACKGROUND = (239, 239, 239)
+ORIENTATION_TAG = 0x0112
+
+if features.check("webp"):
+    _FORMAT, _EXT, _SAVE_OPTIONS = "WEBP", "webp", {"quality": 80, "method": 4}
+else:
+    _FORMAT, _EXT, _SAVE_OPTIONS = "JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}
+
+
+def variant_filename(stem, entry):
+    """'abc123', '236.webp' -> 'thumbs/abc123_236.webp' (relative to uploads/)."""
+    return f"{THUMB_DIR}/{stem}_{entry}"
+
+
+def dominant_color(img):
+    """Most common colour of a small palette-reduced copy, as '#rrggbb'."""
+    small = img.convert("RGB")
+    small.thumbnail((64, 64))
+    palette = small.quantize(colors=5)
+    count, index = max(palette.getcolors())
+    r, g, b = palette.getpalette()[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def strip_metadata(path, upload_folder):
+    """Write a copy of `path` without EXIF (GPS position, camera serials).
+
+    Returns the copy's path, or None if there was nothing to strip. The
+    original is left alone: stored files are content-addressed, so the
+    stripped bytes get a filename of their own. The orientation tag is baked
+    into the pixels first. Unrotated JPEGs keep their quantization tables,
+    so they are not visibly recompressed.
+    """
+    with Image.open(path) as img:
+        exif = img.getexif()
+        if not exif or img.format not in ("JPEG", "PNG", "WEBP"):
+            return None
+        fmt = img.format
+        options = {"icc_profile": img.info.get("icc_profile")}
+        if fmt == "JPEG" and exif.get(ORIENTATION_TAG, 1) == 1:
+            out, options["quality"], options["subsampling"] = img, "keep", "keep"
+        else:
+            out = ImageOps.exif_transpose(img)
+            if fmt == "JPEG":
+                options["quality"] = 95
+        incoming = os.path.join(upload_folder, INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=incoming)
+        with os.fdopen(fd, "wb") as f:
+            out.save(f, fmt, **options)
+    return tmp_path
+
+
+def process_upload(upload_folder, filename):
+    """Everything done to a fresh upload; runs in the worker's process pool.
+
+    Returns the Pin metadata (see process_image) plus "image_filename",
+    which differs from `filename` when EXIF had to be stripped. The stripped
+    copy comes back as "staged" (a storage.Staged) for the caller to store.
+    """
+    path = os.path.join(upload_folder, filename)
+    staged = None
+    stripped = strip_metadata(path, upload_folder)
+    if stripped:
+        staged = stage(stripped, filename.rsplit(".", 1)[1])
+        path, filename = stripped, staged.filename
+    meta = process_image(path, upload_folder, filename.rsplit(".", 1)[0])
+    meta["image_filename"] = filename
+    meta["staged"] = staged
+    return meta
+
+
+def process_image(path, upload_folder, stem):
+    """Write the resized variants of `path` and return the Pin metadata.
+
+    Returns a dict with width, height, dominant_color and variants.
+    Raises OSError (PIL.UnidentifiedImageError) if `path` isn't an image.
+    """
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)  # phone photos come in rotated
+        width, height = img.size
+        color = dominant_color(img)
+
+        keep_alpha = _FORMAT == "WEBP" and "A" in img.getbands()
+        img = img.convert("RGBA" if keep_alpha else "RGB")
+
+        entries = []
+        for target in VARIANT_WIDTHS:
+            # never upscale; small images stop at their own width
+            w = min(target, width)
+            entry = f"{target}.{_EXT}"
+            entries.append(entry)
+            out_path = os.path.join(upload_folder, variant_filename(stem, entry))
+            # a duplicate upload may have made it already (stems are content hashes)
+            if not os.path.exists(out_path):
+                h = max(1, round(height * w / width))
+                resized = img if w == width else img.resize((w, h), Image.Resampling.LANCZOS)
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                resized.save(out_path, _FORMAT, **_SAVE_OPTIONS)
+            if w == width:
+                break
+
+    return {
+        "width": width,
+        "height": height,
+        "dominant_color": color,
+        "variants": ",".join(entries),
+    }
+
+
+def render_collage(upload_folder, sources):
+    """Tile up to COVER_TILES images into one board cover.
+
+    `sources` are paths relative to uploads/, newest first; missing slots
+    stay background-coloured. Returns the cover as a storage.Staged for the
+    caller to store; its content-addressed filename is the same for an
+    unchanged cover.
+    """
+    size = COVER_TILE_SIZE
+    cover = Image.new("RGB", (2 * size, 2 * size), COVER_BACKGROUND)
+    for i, relpath in enumerate(sources[:COVER_TILES]):
+        with Image.open(os.path.join(upload_folder, relpath)) as img:
+            tile = ImageOps.fit(img.convert("RGB"), (size, size), Image.Resampling.LANCZOS)
+        cover.paste(tile, ((i % 2) * size, (i // 2) * size))
+
+    incoming = os.path.join(upload_folder, INCOMING_DIR)
+    os.makedirs(incoming, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=incoming)
+    with os.fdopen(fd, "wb") as f:
+        cover.save(f, _FORMAT, **_SAVE_OPTIONS)
+    return stage(tmp_path, _EXT)
+
+
+def srcset(pin, url_for_upload):
+    """(src, srcset) for a pin's card image; falls back to the original."""
+    if not pin.variants:
+        url = url_for_upload(pin.image_filename)
+        return url, None
+
+    stem = pin.image_filename.rsplit(".", 1)[0]
+    candidates = []
+    for entry in pin.variants.split(","):
+        target = int(entry.split(".", 1)[0])
+        w = min(target, pin.width or target)
+        candidates.append((url_for_upload(variant_filename(stem, entry)), w))
+    src = candidates[0][0]
+    return src, ", ".join(f"{url} {w}w" for url, w in candidates)
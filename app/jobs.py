@@ -0,0 +1,159 @@
+"""A small database-backed job queue.
+
+`enqueue()` adds a Job row to the caller's session, so the job is committed
+(or rolled back) together with whatever created it. `flask worker` claims
+queued jobs, runs each handler in a thread, and handlers push CPU-heavy
+work to a process pool sized to the machine's cores.
+
+Claims are an optimistic `UPDATE ... WHERE state = 'queued'`, so several
+workers can share one database without double-running a job. Every
+SWEEP_INTERVAL a worker refreshes `locked_at` on the jobs it is running
+and puts back jobs left "running" by a worker that died, so those don't
+wait for a worker restart.
+"""
+import json
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from datetime import datetime, timedelta
+
+from . import db
+from .models import Job
+
+log = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+# a job whose locked_at is older than this belonged to a worker that died
+STALE_AFTER = timedelta(minutes=10)
+# how often a worker heartbeats its jobs and requeues stale ones; well
+# under STALE_AFTER, so a live worker's long jobs never look stale
+SWEEP_INTERVAL = 60.0
+
+
+def handler(kind, on_give_up=None):
+    """Register `fn(cpu_pool, **payload)` to run jobs of `kind`.
+
+    `on_give_up(**payload)` runs once a job has used all its attempts.
+    """
+    def decorator(fn):
+        HANDLERS[kind] = (fn, on_give_up)
+        return fn
+    return decorator
+
+
+def enqueue(kind, max_attempts=5, **payload):
+    job = Job(kind=kind, payload=json.dumps(payload), max_attempts=max_attempts)
+    db.session.add(job)
+    return job
+
+
+def backoff(attempts):
+    """Retry delay: 10s, 20s, 40s ... capped at one hour."""
+    return timedelta(seconds=min(10 * 2 ** (attempts - 1), 3600))
+
+
+def heartbeat(job_ids):
+    """Mark this worker's running jobs as alive."""
+    if job_ids:
+        Job.query.filter(Job.id.in_(job_ids), Job.state == "running").update(
+            {Job.locked_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+
+
+def requeue_stale():
+    cutoff = datetime.utcnow() - STALE_AFTER
+    count = Job.query.filter(Job.state == "running", Job.locked_at < cutoff).update(
+        {Job.state: "queued", Job.locked_at: None}, synchronize_session=False
+    )
+    db.session.commit()
+    return count
+
+
+def claim(limit):
+    """Mark up to `limit` due jobs as running and return their ids."""
+    now = datetime.utcnow()
+    candidates = [
+        job_id for (job_id,) in db.session.query(Job.id)
+        .filter(Job.state == "queued", Job.run_after <= now)
+        .order_by(Job.run_after, Job.id)
+        .limit(limit)
+    ]
+    claimed = []
+    for job_id in candidates:
+        won = Job.query.filter_by(id=job_id, state="queued").update(
+            {Job.state: "running", Job.locked_at: now, Job.attempts: Job.attempts + 1},
+            synchronize_session=False,
+        )
+        if won:
+            claimed.append(job_id)
+    db.session.commit()
+    return claimed
+
+
+def run_job(app, cpu_pool, job_id):
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        fn, on_give_up = HANDLERS.get(job.kind, (None, None))
+        payload = json.loads(job.payload)
+        try:
+            if fn is None:
+                raise LookupError(f"no handler for job kind {job.kind!r}")
+            fn(cpu_pool, **payload)
+        except Exception:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.last_error = traceback.format_exc(limit=5)
+            job.locked_at = None
+            if job.attempts >= job.max_attempts:
+                job.state = "failed"
+                log.error("job %s (%s) failed for good", job.id, job.kind)
+                if on_give_up:
+                    on_give_up(**payload)
+            else:
+                job.state = "queued"
+                job.run_after = datetime.utcnow() + backoff(job.attempts)
+                log.warning("job %s (%s) failed, retrying", job.id, job.kind)
+        else:
+            job = db.session.get(Job, job_id)
+            job.state = "done"
+            job.locked_at = None
+        db.session.commit()
+
+
+def run_worker(app, concurrency=None, poll_interval=1.0, once=False):
+    """Process jobs until interrupted (or until the queue is empty if `once`)."""
+    concurrency = concurrency or os.cpu_count() or 1
+    in_flight = {}  # future -> job id
+    next_sweep = 0.0
+
+    with ProcessPoolExecutor(concurrency) as cpu_pool, ThreadPoolExecutor(concurrency) as threads:
+        while True:
+            if time.monotonic() >= next_sweep:
+                with app.app_context():
+                    heartbeat(list(in_flight.values()))
+                    requeue_stale()
+                next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+            free = concurrency - len(in_flight)
+            job_ids = []
+            if free:
+                with app.app_context():
+                    job_ids = claim(free)
+            for job_id in job_ids:
+                in_flight[threads.submit(run_job, app, cpu_pool, job_id)] = job_id
+
+            if in_flight:
+                done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del in_flight[future]
+                    future.result()
+            elif once:
+                return
+            else:
+                time.sleep(poll_interval)
@@ -0,0 +1,102 @@
+"""Write-contention load test, run with `flask load-test`.
+
+Several threads, each logged in as its own user, toggle likes on a small
+set of pins and send each other messages through the real views for a
+fixed time. Without a --database-url this runs twice on throwaway SQLite
+files, once with the connection tuning from app/database.py switched off
+and once with it on, so the difference shows up side by side.
+"""
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+USER_PASSWORD = "loadtest"
+PIN_COUNT = 20
+
+
+def _seed(app, threads):
+    from . import db
+    from .models import Pin, User
+
+    with app.app_context():
+        db.create_all()
+        users = []
+        for i in range(threads):
+            user = User(username=f"loadtest{i}", email=f"loadtest{i}@example.com")
+            user.set_password(USER_PASSWORD)
+            users.append(user)
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all(
+            Pin(title=f"load test pin {i}", image_filename="loadtest.jpg", user_id=users[0].id)
+            for i in range(PIN_COUNT)
+        )
+        db.session.commit()
+        return [u.id for u in users], [p for (p,) in db.session.query(Pin.id)]
+
+
+def _hammer(app, email, user_ids, pin_ids, deadline, results):
+    client = app.test_client()
+    client.post("/login", data={"email": email, "password": USER_PASSWORD})
+    latencies, errors = [], 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        if random.random() < 0.7:
+            response = client.post(f"/pin/{random.choice(pin_ids)}/like")
+        else:
+            response = client.post("/messages/send", data={
+                "recipient_id": random.choice(user_ids), "text": "load test",
+            }, headers={"X-Requested-With": "XMLHttpRequest"})
+        latencies.append(time.perf_counter() - started)
+        # sending to yourself is a 400 by design, not a failure
+        if response.status_code >= 500:
+            errors += 1
+    results.append((latencies, errors))
+
+
+def run(database_url, threads=8, seconds=10.0, tuned=True):
+    """Run one round against `database_url` (which it writes to) and return stats."""
+    from . import create_app
+
+    app = create_app(SQLALCHEMY_DATABASE_URI=database_url, SQLITE_TUNING=tuned)
+    user_ids, pin_ids = _seed(app, threads)
+
+    results = []
+    deadline = time.monotonic() + seconds
+    workers = [
+        threading.Thread(target=_hammer, args=(
+            app, f"loadtest{i}@example.com", user_ids, pin_ids, deadline, results,
+        ))
+        for i in range(threads)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    latencies = sorted(l for ls, _ in results for l in ls)
+    ops = len(latencies)
+    return {
+        "ops": ops,
+        "ops_per_sec": ops / seconds,
+        "errors": sum(e for _, e in results),
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(ops * 0.95) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+def run_sqlite_comparison(threads=8, seconds=10.0):
+    """{"untuned": stats, "tuned": stats} on fresh temporary SQLite files."""
+    out = {}
+    for label, tuned in (("untuned", False), ("tuned", True)):
+        tmp = tempfile.mkdtemp()
+        try:
+            url = "sqlite:///" + os.path.join(tmp, "loadtest.db")
+            out[label] = run(url, threads=threads, seconds=seconds, tuned=tuned)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return out
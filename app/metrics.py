@@ -0,0 +1,210 @@
+"""Per-request instrumentation, served in Prometheus text format at /metrics.
+
+For every request this records, labelled by endpoint: latency, the number
+of SQL statements and the time spent in them (counted through SQLAlchemy
+engine events), and the response size. A jump in statements per request
+is how an N+1 shows up. Statements slower than SLOW_QUERY_MS are logged
+and the most recent ones are kept for /metrics/slow-queries.
+
+With SERVER_TIMING on, the same numbers go out in a Server-Timing header
+(`app;dur=..., db;dur=...;desc="N queries"`) for the browser's network tab.
+
+The registry lives in the process: with several worker processes, each
+reports its own numbers; scrape them individually (or run one process per
+container) and let Prometheus aggregate.
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+SLOW_QUERY_SAMPLES = 50
+SLOW_QUERY_TEXT = 500  # characters of the statement kept per sample
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, label_names):
+        self.name, self.help, self.label_names = name, help, label_names
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} counter")
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+
+
+class Histogram:
+    def __init__(self, name, help, label_names, buckets):
+        self.name, self.help, self.label_names = name, help, label_names
+        self.buckets = buckets
+        # labels -> [count per bucket (not cumulative) ..., +Inf count, sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                le = (("le", bound if bound == "+Inf" else repr(float(bound))),)
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter(
+            "pinboard_requests_total", "Requests handled.", ("endpoint", "method", "status")
+        )
+        self.latency = Histogram(
+            "pinboard_request_duration_seconds", "Time spent in the app per request.",
+            ("endpoint",), LATENCY_BUCKETS,
+        )
+        self.sql_count = Histogram(
+            "pinboard_request_sql_statements", "SQL statements executed per request.",
+            ("endpoint",), SQL_COUNT_BUCKETS,
+        )
+        self.sql_time = Histogram(
+            "pinboard_request_sql_duration_seconds", "Time spent in SQL per request.",
+            ("endpoint",), LATENCY_BUCKETS,
+        )
+        self.size = Histogram(
+            "pinboard_response_size_bytes", "Response body size (unstreamed responses).",
+            ("endpoint",), SIZE_BUCKETS,
+        )
+        self.slow = Counter(
+            "pinboard_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.",
+            ("endpoint",),
+        )
+        self.slow_samples = deque(maxlen=SLOW_QUERY_SAMPLES)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in (
+                self.requests, self.latency, self.sql_count, self.sql_time, self.size, self.slow,
+            ):
+                metric.render(lines)
+        return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    """Flask extension recording per-request latency, SQL and response size."""
+
+    def __init__(self, app=None, db=None):
+        self.registry = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.registry = Registry()
+        self.server_timing = app.config.get("SERVER_TIMING", True)
+        self.slow_query_seconds = app.config.get("SLOW_QUERY_MS", 200) / 1000
+        app.extensions["metrics"] = self
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def render(self):
+        return self.registry.render()
+
+    def slow_queries(self):
+        with self.registry.lock:
+            return list(self.registry.slow_samples)
+
+    def _start(self):
+        g.metrics_started = time.perf_counter()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+
+    def _finish(self, response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or "unmatched"
+        sql_count, sql_seconds = g.get("sql_count", 0), g.get("sql_seconds", 0.0)
+        size = None if response.is_streamed else response.calculate_content_length()
+
+        registry = self.registry
+        with registry.lock:
+            registry.requests.inc((endpoint, request.method, str(response.status_code)))
+            registry.latency.observe((endpoint,), elapsed)
+            registry.sql_count.observe((endpoint,), sql_count)
+            registry.sql_time.observe((endpoint,), sql_seconds)
+            if size is not None:
+                registry.size.observe((endpoint,), size)
+
+        if self.server_timing:
+            response.headers.add(
+                "Server-Timing",
+                f'app;dur={elapsed * 1000:.1f}, '
+                f'db;dur={sql_seconds * 1000:.1f};desc="{sql_count} queries"',
+            )
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None or not has_request_context():
+            return  # background jobs and CLI commands aren't requests
+        elapsed = time.perf_counter() - started
+        g.sql_count = g.get("sql_count", 0) + 1
+        g.sql_seconds = g.get("sql_seconds", 0.0) + elapsed
+
+        if elapsed >= self.slow_query_seconds:
+            endpoint = request.endpoint or "unmatched"
+            log.warning("slow query (%.0f ms) in %s: %s", elapsed * 1000, endpoint, statement)
+            with self.registry.lock:
+                self.registry.slow.inc((endpoint,))
+                self.registry.slow_samples.append({
+                    "at": datetime.utcnow().isoformat(timespec="seconds"),
+                    "endpoint": endpoint,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "statement": statement[:SLOW_QUERY_TEXT],
+                })
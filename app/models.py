@@ -1,14 +1,42 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
 from . import db
 
 
+def insert_ignore(table, **values):
+    """INSERT a row into `table` unless it would break a unique constraint
+    (ON CONFLICT DO NOTHING); returns whether a row went in. Unlike
+    catching IntegrityError in a savepoint, this works on SQLite's default
+    pysqlite transaction handling, and a concurrent duplicate doesn't
+    abort the caller's transaction."""
+    dialect = postgresql if db.session.get_bind().dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(table).values(**values).on_conflict_do_nothing()
+    return db.session.execute(statement).rowcount > 0
+
+
+followers = db.Table(
+    "followers",
+    db.Column("follower_id", db.Integer, db.ForeignKey("user.id"), nullable=False),
+    db.Column("followed_id", db.Integer, db.ForeignKey("user.id"), nullable=False),
+    db.Index("uq_followers_follower_id_followed_id", "follower_id", "followed_id", unique=True),
+    db.Index("ix_followers_followed_id", "followed_id"),
+)
+
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
+    avatar_filename = db.Column(db.String(255), nullable=True)
+    bio = db.Column(db.Text, nullable=True)
+    # kept in step by follow_user; decides fan-out-on-write vs on-read (app/timeline.py)
+    follower_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # in the session cookie via get_id(); bumped to log out sessions (app/identity.py)
+    session_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # relationships
     pins = db.relationship("Pin", backref="author", lazy=True)
@@ -28,68 +56,300 @@ class User(UserMixin, db.Model):
 
     likes = db.relationship("Like", backref="user", lazy=True)
     saves = db.relationship("SavedPin", backref="user", lazy=True)
+    boards = db.relationship("Board", backref="owner", lazy=True)
 
     def set_password(self, password: str):
         self.password_hash = generate_password_hash(password)
+        self.session_version = (self.session_version or 0) + 1
+
+    def get_id(self):
+        return f"{self.id}:{self.session_version}"
 
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
 
 
+pin_tags = db.Table(
+    "pin_tags",
+    db.Column("pin_id", db.Integer, db.ForeignKey("pin.id"), nullable=False),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id"), nullable=False),
+    db.Index("uq_pin_tags_pin_id_tag_id", "pin_id", "tag_id", unique=True),
+    # tag -> pins lookups, newest pin first, read straight off the index
+    db.Index("ix_pin_tags_tag_id_pin_id", "tag_id", "pin_id"),
+)
+
+
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    # number of pins carrying this tag, for popularity ranking
+    pin_count = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+
+
 class Pin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(140), nullable=False)
     description = db.Column(db.Text, nullable=True)
     tags = db.Column(db.String(255), nullable=True)
     image_filename = db.Column(db.String(255), nullable=False)
+    # filled in by the image pipeline (app/images.py)
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    dominant_color = db.Column(db.String(7), nullable=True)
+    variants = db.Column(db.String(64), nullable=True)
+    # pending -> ready | failed, advanced by the process_pin_image job
+    processing_state = db.Column(db.String(16), nullable=False, default="ready", server_default="ready")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # bumped on like/save toggles, so feed pollers can ask for "changed since"
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    # denormalized counters, kept in step by like_pin / save_pin / api_comments
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    save_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # forward-decayed engagement, see app/trending.py
+    trending_score = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     messages = db.relationship("Message", backref="pin", lazy=True)
     likes = db.relationship("Like", backref="pin", lazy=True)
     saves = db.relationship("SavedPin", backref="pin", lazy=True)
     comments = db.relationship("Comment", backref="pin", lazy=True, cascade="all, delete-orphan")
+    # normalized form of the `tags` text above
+    tag_list = db.relationship("Tag", secondary=pin_tags, lazy=True)
+
+    __table_args__ = (
+        # keyset pagination for the home feed: ORDER BY created_at DESC, id DESC
+        db.Index("ix_pin_created_at_id", "created_at", "id"),
+        # /api/explore: ORDER BY trending_score DESC, id DESC
+        db.Index("ix_pin_trending_score_id", "trending_score", "id"),
+    )
+
+
+# materialized following feed: one row per (reader, pin by someone they follow)
+timeline = db.Table(
+    "timeline",
+    db.Column("user_id", db.Integer, db.ForeignKey("user.id"), primary_key=True),
+    db.Column("pin_id", db.Integer, db.ForeignKey("pin.id"), primary_key=True),
+    # unfollow cleanup and pin removal
+    db.Index("ix_timeline_pin_id", "pin_id"),
+)
+
+
+# "more like this" neighbours, rebuilt by `flask build-related` (app/related.py);
+# the (pin_id, rank) key makes a pin's list one ordered range read
+related_pin = db.Table(
+    "related_pin",
+    db.Column("pin_id", db.Integer, db.ForeignKey("pin.id"), primary_key=True),
+    db.Column("rank", db.Integer, primary_key=True),
+    db.Column("related_id", db.Integer, db.ForeignKey("pin.id"), nullable=False),
+    db.Column("score", db.Float, nullable=False),
+    # pin removal
+    db.Index("ix_related_pin_related_id", "related_id"),
+)
+
+
+board_pins = db.Table(
+    "board_pins",
+    db.Column("board_id", db.Integer, db.ForeignKey("board.id"), nullable=False),
+    db.Column("pin_id", db.Integer, db.ForeignKey("pin.id"), nullable=False),
+    db.Index("uq_board_pins_board_id_pin_id", "board_id", "pin_id", unique=True),
+    db.Index("ix_board_pins_pin_id", "pin_id"),
+)
+
+
+class Board(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # kept in step by app/boards.py so board lists never touch board_pins
+    pin_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # 2x2 collage of the newest pins, built by the build_board_cover job
+    cover_filename = db.Column(db.String(255))
+
+    pins = db.relationship("Pin", secondary=board_pins, lazy=True)
+
+
+class Job(db.Model):
+    """Unit of background work, see app/jobs.py."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON kwargs for the handler
+    state = db.Column(db.String(16), nullable=False, default="queued")  # queued/running/done/failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # the worker's "next due job" lookup
+        db.Index("ix_job_state_run_after", "state", "run_after"),
+    )
+
+
+class Upload(db.Model):
+    """A chunked upload in progress, see app/uploads.py."""
+    id = db.Column(db.String(32), primary_key=True)  # random token; names the .part file
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # bytes the client announced
+    ext = db.Column(db.String(8), nullable=True)  # from the magic bytes, once they arrive
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class Blob(db.Model):
+    """A content-addressed upload and how many pins use it, see app/storage.py."""
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), unique=True, nullable=False)  # ab/cd/<sha256>.<ext>
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
     pin_id = db.Column(db.Integer, db.ForeignKey("pin.id"), nullable=False)
+    # replies are one level deep: a reply's parent is always a top-level comment
+    parent_id = db.Column(db.Integer, db.ForeignKey("comment.id"), nullable=True)
+    # kept in step by api_comments, like Pin.comment_count
+    reply_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     user = db.relationship("User", backref="pin_comments", lazy=True)
 
+    __table_args__ = (
+        # a pin's comments in posting order, keyset-paged on (created_at, id)
+        db.Index("ix_comment_pin_id_created_at_id", "pin_id", "created_at", "id"),
+        # a comment's replies, same order
+        db.Index("ix_comment_parent_id_created_at_id", "parent_id", "created_at", "id"),
+    )
+
+
+class Conversation(db.Model):
+    """One row per pair of users who have exchanged messages.
+
+    The pair is stored in canonical order (user_a_id < user_b_id) so there is
+    exactly one row per pair. send_message keeps the summary columns current,
+    so the inbox never has to look at the message table.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_a_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user_b_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_activity = db.Column(db.DateTime, default=datetime.utcnow)
+    unread_a = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    unread_b = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user_a = db.relationship("User", foreign_keys=[user_a_id])
+    user_b = db.relationship("User", foreign_keys=[user_b_id])
+
+    __table_args__ = (
+        db.UniqueConstraint("user_a_id", "user_b_id", name="uq_conversation_user_a_id_user_b_id"),
+        # inbox: a user's conversations, most recent first
+        db.Index("ix_conversation_user_a_id_last_activity", "user_a_id", "last_activity"),
+        db.Index("ix_conversation_user_b_id_last_activity", "user_b_id", "last_activity"),
+    )
+
+    @staticmethod
+    def pair(user_id, other_id):
+        return (user_id, other_id) if user_id < other_id else (other_id, user_id)
+
+    @classmethod
+    def between(cls, user_id, other_id):
+        a, b = cls.pair(user_id, other_id)
+        return cls.query.filter_by(user_a_id=a, user_b_id=b).first()
+
+    @classmethod
+    def get_or_create(cls, user_id, other_id):
+        conversation = cls.between(user_id, other_id)
+        if conversation is not None:
+            return conversation
+        a, b = cls.pair(user_id, other_id)
+        # a no-op if the other user's first message got there first
+        insert_ignore(cls.__table__, user_a_id=a, user_b_id=b)
+        return cls.between(user_id, other_id)
+
+    @classmethod
+    def inbox(cls, user_id):
+        """Query for `user_id`'s conversations, most recent first."""
+        return cls.query.filter(
+            db.or_(cls.user_a_id == user_id, cls.user_b_id == user_id)
+        ).order_by(cls.last_activity.desc(), cls.id.desc())
+
+    def other(self, user_id):
+        return self.user_b if user_id == self.user_a_id else self.user_a
+
+    def unread_for(self, user_id):
+        return self.unread_a if user_id == self.user_a_id else self.unread_b
+
+    def unread_column(self, user_id):
+        cls = type(self)
+        return cls.unread_a if user_id == self.user_a_id else cls.unread_b
+
 
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    sender_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    recipient_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    recipient_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey("conversation.id"), nullable=False)
 
     text = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    pin_id = db.Column(db.Integer, db.ForeignKey("pin.id"), nullable=True)
+    pin_id = db.Column(db.Integer, db.ForeignKey("pin.id"), nullable=True, index=True)
+
+    __table_args__ = (
+        # chat history, paged by id within a conversation
+        db.Index("ix_message_conversation_id_id", "conversation_id", "id"),
+    )
 
 
 class Like(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    pin_id = db.Column(db.Integer, db.ForeignKey("pin.id"), nullable=False)
+    pin_id = db.Column(db.Integer, db.ForeignKey("pin.id"), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     __table_args__ = (
         db.UniqueConstraint("user_id", "pin_id", name="uniq_like_user_pin"),
+        # profile page: the user's most recent first
+        db.Index("ix_like_user_id_created_at", "user_id", "created_at"),
     )
 
 
 class SavedPin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    pin_id = db.Column(db.Integer, db.ForeignKey("pin.id"), nullable=False)
+    pin_id = db.Column(db.Integer, db.ForeignKey("pin.id"), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     __table_args__ = (
         db.UniqueConstraint("user_id", "pin_id", name="uniq_save_user_pin"),
+        # profile page: the user's most recent first
+        db.Index("ix_saved_pin_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+def backfill_pin_counters():
+    """Recompute Pin.like_count/save_count/comment_count from the source tables."""
+    def count_of(model):
+        return (
+            select(func.count(model.id))
+            .where(model.pin_id == Pin.id)
+            .scalar_subquery()
+        )
+
+    result = db.session.execute(
+        db.update(Pin).values(
+            like_count=count_of(Like),
+            save_count=count_of(SavedPin),
+            comment_count=count_of(Comment),
+        )
     )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,168 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+
+
+def page_size(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a ?limit= query value to [1, maximum]."""
+    try:
+        size = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def _encode(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def _decode(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor for a (created_at, id) keyset position."""
+    return _encode([created_at.isoformat() if created_at else None, row_id])
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError on garbage input."""
+    try:
+        created_at, row_id = _decode(cursor)
+        created_at = datetime.fromisoformat(created_at) if created_at else None
+        return created_at, int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def encode_offset_cursor(offset):
+    """Opaque cursor for result sets that can only be paged by offset (ranked search)."""
+    return _encode({"o": offset})
+
+
+def decode_offset_cursor(cursor):
+    try:
+        offset = int(_decode(cursor)["o"])
+    except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+    if offset < 0:
+        raise ValueError("Invalid cursor.")
+    return offset
+
+
+def encode_id_cursor(row_id):
+    """Opaque cursor for result sets ordered by id alone."""
+    return _encode({"i": row_id})
+
+
+def decode_id_cursor(cursor):
+    try:
+        return int(_decode(cursor)["i"])
+    except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def encode_score_cursor(score, row_id):
+    """Opaque cursor for a (score, id) keyset position in a ranked list."""
+    return _encode({"s": score, "i": row_id})
+
+
+def decode_score_cursor(cursor):
+    try:
+        payload = _decode(cursor)
+        return float(payload["s"]), int(payload["i"])
+    except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def keyset_before(created_col, id_col, cursor):
+    """WHERE clause for rows strictly after `cursor` in (created_at DESC, id DESC) order."""
+    created_at, row_id = decode_cursor(cursor)
+    if created_at is None:
+        return and_(created_col.is_(None), id_col < row_id)
+    return or_(
+        created_col < created_at,
+        and_(created_col == created_at, id_col < row_id),
+    )
+
+
+def keyset_after(created_col, id_col, cursor):
+    """WHERE clause for rows strictly after `cursor` in (created_at ASC, id ASC) order."""
+    created_at, row_id = decode_cursor(cursor)
+    if created_at is None:
+        return or_(created_col.isnot(None), and_(created_col.is_(None), id_col > row_id))
+    return or_(
+        created_col > created_at,
+        and_(created_col == created_at, id_col > row_id),
+    )
+
+
+def keyset_page(query, created_col, id_col, cursor=None, limit=DEFAULT_PAGE_SIZE,
+                oldest_first=False):
+    """Fetch one page of `query` in newest-first (or oldest-first) order.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if oldest_first:
+        if cursor:
+            query = query.filter(keyset_after(created_col, id_col, cursor))
+        query = query.order_by(created_col.asc(), id_col.asc())
+    else:
+        if cursor:
+            query = query.filter(keyset_before(created_col, id_col, cursor))
+        query = query.order_by(created_col.desc(), id_col.desc())
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def id_page(query, id_col, cursor=None, limit=DEFAULT_PAGE_SIZE, row_id=None):
+    """Like keyset_page, but ordered by `id_col` DESC alone.
+
+    Use when an index ends in that id column (e.g. pin_tags(tag_id, pin_id)),
+    so the page is read straight off the index. `row_id(row)` extracts the
+    id from a result row; defaults to the attribute named like `id_col`.
+    """
+    if cursor:
+        query = query.filter(id_col < decode_id_cursor(cursor))
+    rows = query.order_by(id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_id = row_id(rows[-1]) if row_id else getattr(rows[-1], id_col.key)
+        next_cursor = encode_id_cursor(last_id)
+    return rows, next_cursor
+
+
+def score_page(query, score_col, id_col, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Like keyset_page, ordered by (`score_col` DESC, `id_col` DESC).
+
+    Scores move while someone pages, so a pin can occasionally show up on
+    two pages or be skipped; the feed is a ranking, not a log.
+    """
+    if cursor:
+        score, row_id = decode_score_cursor(cursor)
+        query = query.filter(or_(
+            score_col < score,
+            and_(score_col == score, id_col < row_id),
+        ))
+    rows = query.order_by(score_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_score_cursor(getattr(last, score_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
@@ -0,0 +1,106 @@
+"""N+1 check, run with `flask check-query-counts`.
+
+Builds a throwaway SQLite database with SMALL rows of each kind (pins by
+different authors with likes, comments on one pin, messages sharing pins),
+requests the feed, comments, chat and dashboard pages and notes how many statements
+each took, as counted by the metrics extension. It then grows the data to
+LARGE rows and asks again. A page that loads something per row issues
+more statements the second time; the command exits 1 if any page does.
+"""
+import os
+import shutil
+import tempfile
+
+SMALL = 3
+LARGE = 30  # at most one page, so every row is on it
+
+
+def _seed(app, users, start, stop):
+    """Pins start..stop-1, each by its own author and liked by the next
+    one, plus a comment on the first pin from each of those authors."""
+    from . import db
+    from .models import Comment, Like, Pin, User
+
+    with app.app_context():
+        first_pin = None
+        for i in range(start, stop):
+            author = User(username=f"author{i}", email=f"author{i}@example.com")
+            author.set_password("pw")
+            db.session.add(author)
+            db.session.flush()
+            pin = Pin(title=f"pin {i}", image_filename="p.png", user_id=author.id, like_count=1)
+            db.session.add(pin)
+            db.session.flush()
+            db.session.add(Like(user_id=users["alice"], pin_id=pin.id))
+            first_pin = first_pin or db.session.scalar(db.select(db.func.min(Pin.id)))
+            db.session.add(Comment(text=f"comment {i}", user_id=author.id, pin_id=first_pin))
+        db.session.get(Pin, first_pin).comment_count = stop
+        db.session.commit()
+        return first_pin
+
+
+def _statements(app, client, url):
+    """How many SQL statements the metrics extension saw for one GET."""
+    registry = app.extensions["metrics"].registry
+    with registry.lock:
+        before = sum(series[-1] for series in registry.sql_count.series.values())
+    response = client.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {url} returned {response.status_code}")
+    with registry.lock:
+        after = sum(series[-1] for series in registry.sql_count.series.values())
+    return int(after - before)
+
+
+def check():
+    """[(url, statements with SMALL rows, statements with LARGE rows)] for
+    every page whose statement count grew with the data."""
+    from . import create_app, db
+    from .models import User
+
+    tmp = tempfile.mkdtemp()
+    try:
+        app = create_app(
+            SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(tmp, "counts.db"),
+            UPLOAD_FOLDER=os.path.join(tmp, "uploads"),
+        )
+        users = {}
+        with app.app_context():
+            db.create_all()
+            for name in ("alice", "bob"):
+                user = User(username=name, email=f"{name}@example.com")
+                user.set_password("pw")
+                db.session.add(user)
+                db.session.flush()
+                users[name] = user.id
+            db.session.commit()
+
+        alice, bob = app.test_client(), app.test_client()
+        alice.post("/login", data={"email": "alice@example.com", "password": "pw"})
+        bob.post("/login", data={"email": "bob@example.com", "password": "pw"})
+
+        def grow(start, stop):
+            pin_id = _seed(app, users, start, stop)
+            for i in range(start, stop):
+                bob.post("/messages/send", data={
+                    "recipient_id": users["alice"], "text": f"look {i}", "pin_id": pin_id,
+                })
+            return pin_id
+
+        counts = {}
+        for rows, start in ((SMALL, 0), (LARGE, SMALL)):
+            pin_id = grow(start, rows)
+            urls = (
+                f"/api/pins?limit={LARGE}",
+                f"/api/pins/{pin_id}/comments?limit={LARGE}",
+                f"/api/messages_for/{users['bob']}?limit={LARGE}",
+                f"/dashboard?tab=messages&chat_with={users['bob']}",
+            )
+            for url in urls:
+                counts.setdefault(url, []).append(_statements(app, alice, url))
+
+        with app.app_context():
+            db.engine.dispose()
+        return [(url, small, large) for url, (small, large) in counts.items() if large > small]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
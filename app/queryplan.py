@@ -0,0 +1,137 @@
+"""Full-table-scan check, run with `flask check-query-plans`.
+
+Builds a throwaway SQLite database from the migrations, drives the main
+routes through a test client, records every SELECT/UPDATE/DELETE they
+issue and runs EXPLAIN QUERY PLAN on each. Any plan step that scans a
+whole table (a bare "SCAN <table>") is reported; the command exits 1 if
+there is one, so it can gate a deploy.
+"""
+import io
+import os
+import re
+import shutil
+import tempfile
+
+from PIL import Image
+from sqlalchemy import event
+
+_FULL_SCAN_RE = re.compile(r"^SCAN (\w+)$")
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+
+
+def _png():
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), (200, 30, 30)).save(buf, "PNG")
+    buf.seek(0)
+    return buf
+
+
+def _exercise(app):
+    """Hit every route worth checking; returns nothing, the SQL is the point."""
+    from . import db
+    from .models import User
+
+    with app.app_context():
+        for name in ("alice", "bob"):
+            user = User(username=name, email=f"{name}@example.com")
+            user.set_password("pw")
+            db.session.add(user)
+        db.session.commit()
+        bob_id = User.query.filter_by(username="bob").one().id
+
+    client = app.test_client()
+    client.post("/login", data={"email": "alice@example.com", "password": "pw"})
+    for i in range(3):
+        client.post("/upload", data={
+            "title": f"pin {i}", "tags": "#plans #check", "image": (_png(), "p.png"),
+        }, content_type="multipart/form-data")
+
+    image = _png().getvalue()
+    upload_id = client.post("/api/uploads", json={"size": len(image)}).get_json()["id"]
+    client.put(f"/api/uploads/{upload_id}?offset=0", data=image)
+    client.get(f"/api/uploads/{upload_id}")
+    client.post(f"/api/uploads/{upload_id}/finish", data={"title": "chunked"})
+
+    feed = client.get("/api/pins?limit=2").get_json()
+    pin_id = feed["pins"][0]["id"]
+    client.post(f"/pin/{pin_id}/like")
+    client.post(f"/pin/{pin_id}/save")
+    comment = client.post(f"/api/pins/{pin_id}/comments", json={"text": "nice"}).get_json()
+    comment_id = comment["comment"]["id"]
+    client.post(f"/api/pins/{pin_id}/comments", json={"text": "agreed", "parent_id": comment_id})
+    client.post(f"/api/pins/{pin_id}/comments", json={"text": "same"})
+    comments = client.get(f"/api/pins/{pin_id}/comments?limit=1").get_json()
+    client.post("/messages/send", data={"recipient_id": bob_id, "text": "hi"})
+    client.post(f"/users/{bob_id}/follow")
+    explore = client.get("/api/explore?limit=1").get_json()
+    board_id = client.post("/api/boards", json={"name": "plans"}).get_json()["board"]["id"]
+    pin_ids = [p["id"] for p in feed["pins"]]
+    client.post(f"/api/boards/{board_id}/pins", json={"add": pin_ids})
+    client.post(f"/api/boards/{board_id}/pins", json={"remove": pin_ids[:1]})
+
+    for url in (
+        "/dashboard",
+        f"/dashboard?tab=messages&chat_with={bob_id}",
+        "/profile",
+        f"/api/pins?limit=2&cursor={feed['next_cursor']}",
+        "/api/pins?q=pin",
+        f"/api/pins?after_id={pin_id}&since={feed['server_time']}",
+        f"/api/messages_for/{bob_id}",
+        f"/api/messages_for/{bob_id}?before_id=1000000",
+        f"/api/messages_for/{bob_id}?after_id=0",
+        f"/api/pins/{pin_id}/comments?cursor={comments['next_cursor']}",
+        f"/api/pins/{pin_id}/comments?order=oldest&limit=1",
+        f"/api/pins/{pin_id}/comments?parent={comment_id}",
+        f"/api/pins/{pin_id}/related",
+        "/api/search_users?q=bo",
+        "/api/tags/plans/pins",
+        "/api/tags/popular",
+        "/api/feed/following",
+        "/api/explore",
+        f"/api/explore?limit=1&cursor={explore['next_cursor']}",
+        "/api/boards",
+        f"/api/boards/{board_id}/pins",
+    ):
+        client.get(url)
+
+
+def check(migrations_dir):
+    """[(statement, plan step)] for every full scan the routes cause."""
+    from . import create_app, db
+    from flask_migrate import upgrade
+
+    tmp = tempfile.mkdtemp()
+    try:
+        app = create_app(
+            SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(tmp, "plans.db"),
+            UPLOAD_FOLDER=os.path.join(tmp, "uploads"),
+        )
+        statements = []
+        with app.app_context():
+            upgrade(directory=migrations_dir)
+            engine = db.engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(_EXPLAINABLE):
+                statements.append((statement, parameters))
+
+        _exercise(app)
+        event.remove(engine, "before_cursor_execute", record)
+
+        problems = []
+        seen = set()
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+                for row in plan:
+                    detail = row[-1]
+                    if _FULL_SCAN_RE.match(detail):
+                        problems.append((statement, detail))
+        engine.dispose()
+        return problems
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,155 @@
+"""Offline "more like this" neighbours, built by `flask build-related`.
+
+Every pin becomes one sparse row made of two L2-normalized halves:
+
+- content: TF-IDF over its tags (counted TAG_WEIGHT times) and the words
+  of its title and description;
+- engagement: the users who liked or saved it.
+
+The dot product of two rows is then a weighted mix of "described alike"
+and "liked by the same people". It is computed as a sparse matrix product
+BLOCK_ROWS pins at a time, the TOP_K best neighbours of each pin are kept,
+and the related_pin table is replaced with them in one transaction, so
+/api/pins/<id>/related is a primary-key range read.
+
+Needs NumPy and SciPy, which nothing else in the app uses.
+"""
+import re
+
+from sqlalchemy import delete, insert, select
+
+from . import db
+from .models import Like, Pin, SavedPin, Tag, pin_tags, related_pin
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # optional, only needed for `flask build-related`
+    np = sparse = None
+
+TOP_K = 24
+BLOCK_ROWS = 1024
+INSERT_BATCH = 5000
+CONTENT_WEIGHT = 0.6
+ENGAGEMENT_WEIGHT = 0.4
+TAG_WEIGHT = 2.0
+# terms on more than this share of pins say little about similarity and
+# would make the product dense; small sites keep them up to MIN_DOC_LIMIT
+MAX_DOC_FREQ = 0.05
+MIN_DOC_LIMIT = 50
+MIN_SCORE = 0.01
+
+_WORD_RE = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+_STOP_WORDS = frozenset(
+    "the and for with this that from your you are was were have has not but "
+    "all any can our out its into over more some what when".split()
+)
+
+
+def words(text):
+    return [w for w in _WORD_RE.findall((text or "").lower()) if w not in _STOP_WORDS]
+
+
+def _matrix(triples, n_rows):
+    """CSR matrix from (row, feature key, weight); repeated cells add up."""
+    columns = {}
+    rows, cols, data = [], [], []
+    for row, key, weight in triples:
+        rows.append(row)
+        cols.append(columns.setdefault(key, len(columns)))
+        data.append(weight)
+    return sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float64), (rows, cols)),
+        shape=(n_rows, max(len(columns), 1)),
+    )
+
+
+def _normalize_rows(m):
+    norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ m
+
+
+def _tfidf(m):
+    """Log term frequency times IDF, dropping terms too rare or too common to matter."""
+    n_rows = m.shape[0]
+    df = np.bincount(m.indices, minlength=m.shape[1])
+    # a term on a single pin can't link it to anything
+    keep = (df >= 2) & (df <= max(MAX_DOC_FREQ * n_rows, MIN_DOC_LIMIT))
+    m = m.tocsr(copy=True)
+    m.data = np.log1p(m.data) * np.log(n_rows / np.maximum(df, 1))[m.indices]
+    return m[:, np.flatnonzero(keep)]
+
+
+def _features(pin_ids):
+    """(content, engagement) matrices with one row per pin in `pin_ids`."""
+    row_of = {pid: i for i, pid in enumerate(pin_ids)}
+
+    def content():
+        for pid, title, description in db.session.execute(
+            select(Pin.id, Pin.title, Pin.description).order_by(Pin.id)
+        ):
+            if pid in row_of:
+                for w in words(title) + words(description):
+                    yield row_of[pid], w, 1.0
+        for pid, name in db.session.execute(
+            select(pin_tags.c.pin_id, Tag.name).join(Tag, Tag.id == pin_tags.c.tag_id)
+        ):
+            if pid in row_of:
+                yield row_of[pid], "#" + name, TAG_WEIGHT
+
+    def engagement():
+        for model in (Like, SavedPin):
+            for pid, uid in db.session.execute(select(model.pin_id, model.user_id)):
+                if pid in row_of:
+                    yield row_of[pid], uid, 1.0
+
+    n = len(pin_ids)
+    eng = _matrix(engagement(), n)
+    eng.data[:] = 1.0  # liked and saved counts once
+    return _tfidf(_matrix(content(), n)), eng
+
+
+def _top_k(x, k, block_rows=BLOCK_ROWS):
+    """Yield (rows, cols, scores, ranks) of each row's k best neighbours in x @ x.T."""
+    xt = x.T.tocsc()
+    for start in range(0, x.shape[0], block_rows):
+        sims = (x[start:start + block_rows] @ xt).tocoo()
+        mask = (sims.col != sims.row + start) & (sims.data >= MIN_SCORE)
+        r, c, v = sims.row[mask], sims.col[mask], sims.data[mask]
+        # by row, best score first, lower index breaking ties
+        order = np.lexsort((c, -v, r))
+        r, c, v = r[order], c[order], v[order]
+        rank = np.arange(len(r)) - np.searchsorted(r, r)
+        keep = rank < k
+        yield r[keep] + start, c[keep], v[keep], rank[keep]
+
+
+def build(top_k=TOP_K, block_rows=BLOCK_ROWS):
+    """Recompute related_pin for every pin. Returns (pins, rows stored)."""
+    if np is None:
+        raise RuntimeError("build-related needs numpy and scipy: pip install numpy scipy")
+
+    pin_ids = list(db.session.scalars(
+        select(Pin.id).where(Pin.processing_state != "failed").order_by(Pin.id)
+    ))
+    db.session.execute(delete(related_pin))
+    stored = 0
+    if len(pin_ids) > 1:
+        content, engagement = _features(pin_ids)
+        x = sparse.hstack([
+            np.sqrt(CONTENT_WEIGHT) * _normalize_rows(content),
+            np.sqrt(ENGAGEMENT_WEIGHT) * _normalize_rows(engagement),
+        ]).tocsr()
+
+        ids = np.asarray(pin_ids)
+        for rows, cols, scores, ranks in _top_k(x, top_k, block_rows):
+            values = [
+                {"pin_id": int(p), "rank": int(rank), "related_id": int(q), "score": float(s)}
+                for p, q, s, rank in zip(ids[rows], ids[cols], scores, ranks)
+            ]
+            for i in range(0, len(values), INSERT_BATCH):
+                db.session.execute(insert(related_pin), values[i:i + INSERT_BATCH])
+            stored += len(values)
+    db.session.commit()
+    return len(pin_ids), stored
@@ -0,0 +1,179 @@
+"""Indexed search for pins and users.
+
+SQLite uses the FTS5 tables `pin_fts` / `user_fts`, Postgres uses a
+tsvector expression index on pin and a trigram index on user.username.
+Both are created (and kept in sync by triggers / the index itself) by
+the search migration. If neither is available the old ILIKE scan is used
+so search keeps working on an unmigrated dev database.
+
+SQLite's batch_alter_table rebuilds a table by copying it, which drops its
+triggers, so migrations that batch-alter pin or user call
+create_search_triggers() afterwards.
+"""
+import re
+
+from sqlalchemy import false, func, inspect, or_, text
+
+from . import db
+
+# weighted document for Postgres; must match the ix_pin_search expression
+PG_PIN_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+# FTS5 sync triggers; only text edits touch the index, not counter/timestamp updates
+SQLITE_TRIGGERS = {
+    "pin_fts_ai": "CREATE TRIGGER pin_fts_ai AFTER INSERT ON pin BEGIN "
+    "INSERT INTO pin_fts(rowid, title, description, tags) "
+    "VALUES (new.id, new.title, new.description, new.tags); END",
+    "pin_fts_ad": "CREATE TRIGGER pin_fts_ad AFTER DELETE ON pin BEGIN "
+    "INSERT INTO pin_fts(pin_fts, rowid, title, description, tags) "
+    "VALUES ('delete', old.id, old.title, old.description, old.tags); END",
+    "pin_fts_au": "CREATE TRIGGER pin_fts_au AFTER UPDATE OF title, description, tags ON pin BEGIN "
+    "INSERT INTO pin_fts(pin_fts, rowid, title, description, tags) "
+    "VALUES ('delete', old.id, old.title, old.description, old.tags); "
+    "INSERT INTO pin_fts(rowid, title, description, tags) "
+    "VALUES (new.id, new.title, new.description, new.tags); END",
+    "user_fts_ai": 'CREATE TRIGGER user_fts_ai AFTER INSERT ON "user" BEGIN '
+    "INSERT INTO user_fts(rowid, username) VALUES (new.id, new.username); END",
+    "user_fts_ad": 'CREATE TRIGGER user_fts_ad AFTER DELETE ON "user" BEGIN '
+    "INSERT INTO user_fts(user_fts, rowid, username) "
+    "VALUES ('delete', old.id, old.username); END",
+    "user_fts_au": 'CREATE TRIGGER user_fts_au AFTER UPDATE OF username ON "user" BEGIN '
+    "INSERT INTO user_fts(user_fts, rowid, username) "
+    "VALUES ('delete', old.id, old.username); "
+    "INSERT INTO user_fts(rowid, username) VALUES (new.id, new.username); END",
+}
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_MAX_TERMS = 8
+
+_backend_cache = {}
+
+
+def _backend():
+    """'fts5', 'postgres' or None (no index, fall back to ILIKE)."""
+    engine = db.engine
+    if engine not in _backend_cache:
+        name = engine.dialect.name
+        if name == "sqlite":
+            ready = inspect(engine).has_table("pin_fts")
+            _backend_cache[engine] = "fts5" if ready else None
+        elif name == "postgresql":
+            _backend_cache[engine] = "postgres"
+        else:
+            _backend_cache[engine] = None
+    return _backend_cache[engine]
+
+
+def create_search_triggers(bind):
+    """(Re)create the FTS5 sync triggers on `bind` and reindex pin_fts and
+    user_fts from their tables, which also repairs an index that went stale
+    while the triggers were missing. A no-op off SQLite or before the
+    search migration."""
+    if bind.dialect.name != "sqlite" or not inspect(bind).has_table("pin_fts"):
+        return
+    for name, ddl in SQLITE_TRIGGERS.items():
+        bind.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        bind.execute(text(ddl))
+    bind.execute(text("INSERT INTO pin_fts(pin_fts) VALUES ('rebuild')"))
+    bind.execute(text("INSERT INTO user_fts(user_fts) VALUES ('rebuild')"))
+
+
+def _terms(q):
+    return _WORD_RE.findall(q.lower())[:_MAX_TERMS]
+
+
+def _fts5_query(q):
+    # every term is quoted (so user input can't inject FTS syntax) and
+    # prefix-matched, which makes search-as-you-type work
+    return " ".join(f'"{t}"*' for t in _terms(q))
+
+
+def _pg_query(q):
+    return " & ".join(f"{t}:*" for t in _terms(q))
+
+
+def _ilike_filter(model, q):
+    return or_(
+        model.title.ilike(f"%{q}%"),
+        model.description.ilike(f"%{q}%"),
+        model.tags.ilike(f"%{q}%"),
+    )
+
+
+def ranked_pin_ids(q, offset=0, limit=30):
+    """Pin ids matching `q`, best match first."""
+    from .models import Pin
+
+    backend = _backend()
+    if not _terms(q):
+        return []
+    if backend == "fts5":
+        sql = text(
+            "SELECT rowid FROM pin_fts WHERE pin_fts MATCH :m "
+            "ORDER BY bm25(pin_fts, 10.0, 1.0, 5.0), rowid DESC "
+            "LIMIT :limit OFFSET :offset"
+        )
+        params = {"m": _fts5_query(q), "limit": limit, "offset": offset}
+    elif backend == "postgres":
+        sql = text(
+            f"SELECT id FROM pin WHERE {PG_PIN_VECTOR} @@ to_tsquery('simple', :m) "
+            f"ORDER BY ts_rank({PG_PIN_VECTOR}, to_tsquery('simple', :m)) DESC, id DESC "
+            "LIMIT :limit OFFSET :offset"
+        )
+        params = {"m": _pg_query(q), "limit": limit, "offset": offset}
+    else:
+        rows = (
+            db.session.query(Pin.id)
+            .filter(_ilike_filter(Pin, q))
+            .order_by(Pin.created_at.desc(), Pin.id.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+        return [pid for (pid,) in rows]
+
+    return [pid for (pid,) in db.session.execute(sql, params)]
+
+
+def filter_pins(query, q):
+    """Restrict a Pin query to pins matching `q` (unranked)."""
+    from .models import Pin
+
+    backend = _backend()
+    if not _terms(q):
+        return query.filter(false())
+    if backend == "fts5":
+        matches = text("SELECT rowid FROM pin_fts WHERE pin_fts MATCH :m")
+        return query.filter(Pin.id.in_(matches.bindparams(m=_fts5_query(q))))
+    if backend == "postgres":
+        return query.filter(
+            text(f"{PG_PIN_VECTOR} @@ to_tsquery('simple', :m)").bindparams(m=_pg_query(q))
+        )
+    return query.filter(_ilike_filter(Pin, q))
+
+
+def search_users(q, limit=10, exclude_id=None):
+    """Username typeahead: prefix match, shortest names first."""
+    from .models import User
+
+    backend = _backend()
+    query = User.query
+    if exclude_id is not None:
+        query = query.filter(User.id != exclude_id)
+
+    if backend == "fts5":
+        if not _terms(q):
+            return []
+        matches = text("SELECT rowid FROM user_fts WHERE user_fts MATCH :m")
+        query = query.filter(User.id.in_(matches.bindparams(m=_fts5_query(q))))
+    elif backend == "postgres":
+        # served by the gin_trgm_ops index on username
+        escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(User.username.ilike(f"{escaped}%", escape="\\"))
+    else:
+        query = query.filter(User.username.ilike(f"%{q}%"))
+
+    return query.order_by(func.length(User.username), User.username).limit(limit).all()
@@ -0,0 +1,319 @@
+"""Synthetic data for load and benchmark runs, generated by `flask seed`.
+
+Activity is skewed the way real sites are: a few users do most of the
+liking, saving and posting, and a few pins get most of the attention
+(Zipf-like weights over a shuffled order, so popular pins aren't simply
+the oldest). Every row goes in through batched Core `executemany`
+inserts with ids assigned up front, and the denormalized state the app
+keeps on write (Pin counters and trending_score, Tag.pin_count,
+Conversation summaries, Blob refcounts) is computed alongside, so the
+result looks like data the app itself produced.
+
+All seeded users log in with SEED_PASSWORD. The same `seed` argument
+always gives the same data.
+"""
+import bisect
+import os
+import random
+from datetime import datetime, timedelta
+
+from PIL import Image
+from sqlalchemy import func, insert, select, text, update
+
+from . import db, storage, trending
+from .images import process_image
+from .models import (
+    Blob, Comment, Conversation, Like, Message, Pin, SavedPin, Tag, User, pin_tags,
+)
+from .tags import get_or_create_tags
+
+SEED_PASSWORD = "seed-password"
+BATCH = 10000
+SKEW = 1.1  # Zipf exponent for user activity and pin popularity
+PLACEHOLDER_SIZES = ((600, 900), (600, 600), (600, 400), (600, 1200), (600, 750), (600, 500))
+PLACEHOLDER_COLOURS = ((214, 93, 77), (72, 125, 180), (98, 160, 110), (230, 190, 90),
+                       (150, 110, 170), (90, 90, 90))
+WORDS = (
+    "autumn kitchen cabin garden recipe minimal vintage ocean city studio travel "
+    "coffee bedroom poster sketch wedding summer winter forest desert modern rustic "
+    "pasta cake bread salad sunset mountain lake street portrait pattern texture "
+    "typography logo illustration outfit sneakers jewelry plants ceramics workspace"
+).split()
+
+
+class _Skewed:
+    """Draws indexes in [0, n) with Zipf-like weights, over a shuffled order."""
+
+    def __init__(self, rng, n, shuffle=True):
+        self.rng = rng
+        self.order = list(range(n))
+        if shuffle:
+            rng.shuffle(self.order)
+        weights = [1.0 / (rank + 1) ** SKEW for rank in range(n)]
+        self.cumulative = []
+        total = 0.0
+        for w in weights:
+            total += w
+            self.cumulative.append(total)
+        self.total = total
+
+    def draw(self):
+        rank = bisect.bisect_left(self.cumulative, self.rng.random() * self.total)
+        return self.order[min(rank, len(self.order) - 1)]
+
+    def share(self, total, cap):
+        """Split `total` over the indexes in proportion to their weight,
+        at most `cap` each; what the capped ones can't take goes to the rest."""
+        out = [0] * len(self.order)
+        weights = {self.order[r]: w for r, w in enumerate(self._weights())}
+        while total > 0 and weights:
+            scale = total / sum(weights.values())
+            for i, w in list(weights.items()):
+                take = min(cap - out[i], max(1, round(w * scale)), total)
+                out[i] += take
+                total -= take
+                if out[i] >= cap:
+                    del weights[i]
+                if total == 0:
+                    break
+        return out
+
+    def _weights(self):
+        previous = 0.0
+        for cumulative in self.cumulative:
+            yield cumulative - previous
+            previous = cumulative
+
+
+def _next_id(model):
+    return (db.session.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def _insert(table, rows):
+    """executemany `rows` in BATCH-sized chunks; `rows` may be a generator."""
+    batch, count = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            db.session.execute(insert(table), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+
+def _placeholders(upload_folder):
+    """Stored placeholder images with their variants: [(filename, meta)]."""
+    out = []
+    incoming = os.path.join(upload_folder, storage.INCOMING_DIR)
+    os.makedirs(incoming, exist_ok=True)
+    for size, colour in zip(PLACEHOLDER_SIZES, PLACEHOLDER_COLOURS):
+        tmp_path = os.path.join(incoming, f"seed-{size[0]}x{size[1]}.jpg")
+        Image.new("RGB", size, colour).save(tmp_path, "JPEG", quality=85)
+        filename, _ = storage.store_file(tmp_path, upload_folder, "jpg")
+        meta = process_image(
+            os.path.join(upload_folder, filename), upload_folder, filename.rsplit(".", 1)[0]
+        )
+        out.append((filename, meta))
+    return out
+
+
+def _distinct_pairs(rng, user_counts, pin_picker, n_pins, user_ids, pin_ids):
+    """(user id, pin id) pairs, user i appearing user_counts[i] times, no repeats."""
+    for i, count in enumerate(user_counts):
+        chosen = set()
+        attempts = 0
+        while len(chosen) < count:
+            # heavy users exhaust the popular pins; top up with uniform picks
+            attempts += 1
+            chosen.add(pin_picker.draw() if attempts < count * 2 else rng.randrange(n_pins))
+        for p in chosen:
+            yield user_ids[i], pin_ids[p]
+
+
+def _sync_sequences():
+    """Explicit ids leave Postgres sequences behind; move them past the new rows."""
+    if db.engine.dialect.name != "postgresql":
+        return
+    for table in ("user", "pin", "conversation", "message"):
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+            f"(SELECT MAX(id) FROM \"{table}\"))"
+        ))
+
+
+def seed(upload_folder, users=1000, pins=10000, likes=100000, saves=20000,
+         comments=20000, messages=20000, days=90, seed=1, log=print):
+    """Generate the rows and commit them. Returns {table: rows inserted}."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    start = now - timedelta(days=days)
+    span = (now - start).total_seconds()
+    settings = trending.decay_settings()
+    counts = {}
+
+    def at_after(t):
+        return t + timedelta(seconds=rng.random() * (now - t).total_seconds())
+
+    # users
+    first_user = _next_id(User)
+    user_ids = list(range(first_user, first_user + users))
+    probe = User(username="-", email="-")
+    probe.set_password(SEED_PASSWORD)
+    counts["user"] = _insert(User.__table__, (
+        {"id": uid, "username": f"seed{uid}", "email": f"seed{uid}@example.com",
+         "password_hash": probe.password_hash,
+         "bio": " ".join(rng.sample(WORDS, 4))}
+        for uid in user_ids
+    ))
+    db.session.commit()
+    log(f"users: {counts['user']}")
+    active = _Skewed(rng, users)
+
+    # pins, created evenly over the period so id order is time order
+    images = _placeholders(upload_folder)
+    tag_rows = get_or_create_tags(rng.sample(WORDS, min(len(WORDS), 30)))
+    tags = _Skewed(rng, len(tag_rows))
+    first_pin = _next_id(Pin)
+    pin_ids = list(range(first_pin, first_pin + pins))
+    pin_created = [start + timedelta(seconds=span * i / max(pins, 1)) for i in range(pins)]
+    pin_tag_ids = []
+
+    def pin_rows():
+        for i, pid in enumerate(pin_ids):
+            filename, meta = images[i % len(images)]
+            chosen = sorted({tags.draw() for _ in range(rng.randint(0, 3))})
+            pin_tag_ids.append([tag_rows[t].id for t in chosen])
+            yield {
+                "id": pid,
+                "title": " ".join(rng.sample(WORDS, rng.randint(2, 4))).capitalize(),
+                "description": " ".join(rng.sample(WORDS, rng.randint(0, 8))) or None,
+                "tags": " ".join("#" + tag_rows[t].name for t in chosen) or None,
+                "image_filename": filename,
+                "processing_state": "ready",
+                "created_at": pin_created[i],
+                "updated_at": pin_created[i],
+                "user_id": user_ids[active.draw()],
+                **meta,
+            }
+    counts["pin"] = _insert(Pin.__table__, pin_rows())
+    counts["pin_tags"] = _insert(pin_tags, (
+        {"pin_id": pid, "tag_id": tid}
+        for pid, tids in zip(pin_ids, pin_tag_ids) for tid in tids
+    ))
+    # storing each placeholder took one reference already
+    for i, (filename, _) in enumerate(images):
+        uses = len(range(i, pins, len(images)))
+        Blob.query.filter_by(filename=filename).update(
+            {Blob.ref_count: Blob.ref_count + uses - 1}, synchronize_session=False
+        )
+    db.session.commit()
+    log(f"pins: {counts['pin']}")
+
+    popular = _Skewed(rng, pins)
+    like_count = [0] * pins
+    save_count = [0] * pins
+    comment_count = [0] * pins
+    score = [0.0] * pins
+    index_of = {pid: i for i, pid in enumerate(pin_ids)}
+
+    def engagement(kind, total, counter):
+        # nobody likes more than a tenth of all pins
+        shares = active.share(total, cap=max(1, pins // 10))
+        for uid, pid in _distinct_pairs(rng, shares, popular, pins, user_ids, pin_ids):
+            i = index_of[pid]
+            created_at = at_after(pin_created[i])
+            counter[i] += 1
+            score[i] += trending.contribution(kind, created_at, settings)
+            yield {"user_id": uid, "pin_id": pid, "created_at": created_at}
+
+    counts["like"] = _insert(Like.__table__, engagement("like", likes, like_count))
+    db.session.commit()
+    log(f"likes: {counts['like']}")
+    counts["saved_pin"] = _insert(SavedPin.__table__, engagement("save", saves, save_count))
+    db.session.commit()
+    log(f"saves: {counts['saved_pin']}")
+
+    def comment_rows():
+        for _ in range(comments):
+            i = popular.draw()
+            created_at = at_after(pin_created[i])
+            comment_count[i] += 1
+            score[i] += trending.contribution("comment", created_at, settings)
+            yield {
+                "text": " ".join(rng.sample(WORDS, rng.randint(2, 10))),
+                "created_at": created_at,
+                "user_id": user_ids[active.draw()],
+                "pin_id": pin_ids[i],
+            }
+    counts["comment"] = _insert(Comment.__table__, comment_rows())
+
+    db.session.execute(update(Pin), [
+        {"id": pid, "like_count": like_count[i], "save_count": save_count[i],
+         "comment_count": comment_count[i], "trending_score": score[i]}
+        for i, pid in enumerate(pin_ids)
+        if like_count[i] or save_count[i] or comment_count[i]
+    ])
+    db.session.execute(
+        update(Tag)
+        .where(Tag.id.in_([t.id for t in tag_rows]))
+        .values(pin_count=select(func.count()).select_from(pin_tags)
+                .where(pin_tags.c.tag_id == Tag.id).scalar_subquery())
+    )
+    db.session.commit()
+    log(f"comments: {counts['comment']}")
+
+    # conversations between skewed pairs, messages in time order
+    pairs = {}
+    if users > 1:
+        for _ in range(max(1, messages // 10)):
+            a, b = user_ids[active.draw()], user_ids[active.draw()]
+            if a != b:
+                pairs.setdefault((min(a, b), max(a, b)), len(pairs))
+    chats = _Skewed(rng, len(pairs)) if pairs else None
+    timeline = sorted(
+        (start + timedelta(seconds=rng.random() * span), chats.draw())
+        for _ in range(messages if pairs else 0)
+    )
+    # only pairs that actually got a message become conversations
+    by_index = {c: pair for pair, c in pairs.items()}
+    used = sorted({c for _, c in timeline})
+    conversations = [by_index[c] for c in used]
+    renumber = {c: i for i, c in enumerate(used)}
+    timeline = [(created_at, renumber[c]) for created_at, c in timeline]
+    first_conversation = _next_id(Conversation)
+    last = {}
+    first_message = _next_id(Message)
+
+    def message_rows():
+        for offset, (created_at, c) in enumerate(timeline):
+            a, b = conversations[c]
+            sender, recipient = (a, b) if rng.random() < 0.5 else (b, a)
+            last[c] = (first_message + offset, created_at)
+            yield {
+                "id": first_message + offset,
+                "sender_id": sender,
+                "recipient_id": recipient,
+                "conversation_id": first_conversation + c,
+                "text": " ".join(rng.sample(WORDS, rng.randint(1, 8))),
+                "created_at": created_at,
+                "pin_id": pin_ids[popular.draw()] if pins and rng.random() < 0.1 else None,
+            }
+
+    # conversation rows first (messages reference them); summaries after
+    counts["conversation"] = _insert(Conversation.__table__, (
+        {"id": first_conversation + c, "user_a_id": a, "user_b_id": b, "created_at": start}
+        for c, (a, b) in enumerate(conversations)
+    ))
+    counts["message"] = _insert(Message.__table__, message_rows())
+    if last:
+        db.session.execute(update(Conversation), [
+            {"id": first_conversation + c, "last_message_id": mid, "last_activity": created_at}
+            for c, (mid, created_at) in last.items()
+        ])
+    _sync_sequences()
+    db.session.commit()
+    log(f"messages: {counts['message']} in {counts['conversation']} conversations")
+    return counts
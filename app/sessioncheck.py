@@ -0,0 +1,63 @@
+"""Identity cache check, run with `flask check-sessions`.
+
+Builds a throwaway SQLite database, logs a user in through a test client
+so load_user caches them, then changes the password and the username
+outside any request, the way a password reset or a profile edit commits.
+The old session must be refused on its very next request and the new name
+must show up, even though the cache TTL has not run out. The command
+exits 1 if either fails.
+"""
+import os
+import shutil
+import tempfile
+
+_PROBE = "/api/pins?limit=1"
+
+
+def check():
+    """A list of failure descriptions; empty when the cache behaves."""
+    from . import create_app, db
+    from .models import User
+
+    tmp = tempfile.mkdtemp()
+    try:
+        app = create_app(
+            SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(tmp, "sessions.db"),
+            UPLOAD_FOLDER=os.path.join(tmp, "uploads"),
+            USER_CACHE_TTL=3600,
+        )
+        with app.app_context():
+            db.create_all()
+            user = User(username="alice", email="alice@example.com")
+            user.set_password("old")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+        problems = []
+        client = app.test_client()
+        client.post("/login", data={"email": "alice@example.com", "password": "old"})
+        for _ in range(2):  # the second request is served from the cache
+            if client.get(_PROBE).status_code != 200:
+                problems.append("a fresh session was refused")
+
+        with app.app_context():
+            db.session.get(User, user_id).set_password("new")
+            db.session.commit()
+        if client.get(_PROBE).status_code == 200:
+            problems.append("the session from before the password change was accepted")
+
+        client = app.test_client()
+        client.post("/login", data={"email": "alice@example.com", "password": "new"})
+        client.get(_PROBE)
+        with app.app_context():
+            db.session.get(User, user_id).username = "alice2"
+            db.session.commit()
+        if b"alice2" not in client.get("/profile").data:
+            problems.append("the profile page showed the username from before the edit")
+
+        with app.app_context():
+            db.engine.dispose()
+        return problems
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -135,22 +135,77 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   }
 
-  // Live messages polling for active chat
+  // Server push; polling below only runs while this is disconnected
+  const stream = window.EventSource ? new EventSource("/api/stream") : null;
+  if (stream) {
+    stream.addEventListener("pin_comments", (e) => {
+      const data = JSON.parse(e.data);
+      const modalEl = document.getElementById("globalPinModal");
+      const openId = document.getElementById("pinModalId");
+      if (modalEl && modalEl.classList.contains("show") && openId && openId.value == data.id) {
+        window.openPinModal(data.id, document.getElementById("pinModalImage").src, document.getElementById("pinModalTitle").textContent, document.getElementById("pinModalDesc").textContent, document.getElementById("pinModalAuthor").textContent, document.getElementById("pinModalAuthorAvatar").textContent);
+      }
+    });
+  }
+
+  // Live messages for active chat
   const chatMessages = document.getElementById("chatMessages");
   if (chatMessages) {
     const otherId = chatMessages.dataset.chatUserId;
     if (otherId) {
-      startMessagesPolling(otherId, chatMessages);
+      startMessagesPolling(otherId, chatMessages, stream);
     }
   }
 
-  // Live pins polling for home feed
+  // Live pins for home feed
   const pinGrid = document.getElementById("pinGrid");
   if (pinGrid) {
-    startPinsPolling(pinGrid);
+    startPinsPolling(pinGrid, stream);
+  }
+
+  const followingGrid = document.getElementById("followingGrid");
+  if (followingGrid) {
+    startPagedGrid(followingGrid, "/api/feed/following", document.getElementById("followingEmpty"));
+  }
+
+  const exploreGrid = document.getElementById("exploreGrid");
+  if (exploreGrid) {
+    startPagedGrid(exploreGrid, "/api/explore");
+  }
+
+  attachFollowHandlers();
+
+  const boardsSection = document.getElementById("boardsSection");
+  if (boardsSection) {
+    startBoards(boardsSection);
+  }
+
+  const uploadForm = document.getElementById("uploadForm");
+  if (uploadForm && window.fetch && window.Blob && Blob.prototype.slice) {
+    startChunkedUpload(uploadForm);
   }
 });
 
+// Follow / unfollow toggles
+function attachFollowHandlers() {
+  document.querySelectorAll(".follow-btn").forEach(btn => {
+    btn.addEventListener("click", async () => {
+      try {
+        const res = await fetch(`/users/${btn.dataset.user}/follow`, { method: "POST" });
+        const data = await res.json();
+        if (data.ok) btn.textContent = data.following ? "Following" : "Follow";
+      } catch (err) {
+        console.error("follow error", err);
+      }
+    });
+  });
+}
+
+// true while the SSE connection is up, i.e. polling can be skipped
+function streamConnected(stream) {
+  return stream && stream.readyState === EventSource.OPEN;
+}
+
 // Attach share popup & search handlers
 function attachShareHandlers() {
   // buttons
@@ -244,6 +299,9 @@ function attachLikeSaveHandlers() {
           if (iconSpan) iconSpan.textContent = "♡";
         }
         if (countSpan) countSpan.textContent = data.count;
+        document.dispatchEvent(new CustomEvent("pinboard:pin-updated", {
+          detail: { id: Number(pinId), liked: data.liked, likes_count: data.count }
+        }));
       } catch (err) {
         console.error("like error", err);
       }
@@ -276,6 +334,9 @@ function attachLikeSaveHandlers() {
           btn.classList.remove("active");
           if (iconSpan) iconSpan.textContent = "🔖 Save";
         }
+        document.dispatchEvent(new CustomEvent("pinboard:pin-updated", {
+          detail: { id: Number(pinId), saved: data.saved }
+        }));
       } catch (err) {
         console.error("save error", err);
       }
@@ -346,135 +407,564 @@ function showToast(message, isError = false) {
   }, 3000);
 }
 
-// polling: keep DM updated without manual refresh
-function startMessagesPolling(otherId, container) {
-  let lastJson = null;
+// keep DM updated without manual refresh
+// After the first full load only messages newer than the last seen id
+// are requested and appended. With a live stream, fetches happen only
+// when a message for this conversation is pushed.
+function startMessagesPolling(otherId, container, stream) {
+  let lastId = null;
+  let firstId = null;   // oldest message shown, for paging back
+  let hasMore = false;
+  let loadingOlder = false;
+
+  // message and pin text are set with textContent, never parsed as HTML
+  function renderMessage(m, otherUsername) {
+    const wrapper = document.createElement("div");
+    wrapper.className = "mb-2";
+
+    const who = document.createElement("strong");
+    who.textContent = (m.from_me ? "You" : otherUsername) + ":";
+    wrapper.append(who, " ");
+    if (m.text) {
+      wrapper.append(m.text);
+    }
+    if (m.pin) {
+      const shared = document.createElement("div");
+      shared.className = "mt-1 p-2 border rounded small";
+      shared.innerHTML = `
+        <div class="fw-semibold mb-1">Shared pin:</div>
+        <div class="d-flex align-items-center gap-2">
+          <img class="shared-pin-thumb">
+          <div>
+            <div class="fw-semibold text-truncate"></div>
+            <small class="text-muted d-block text-truncate"></small>
+          </div>
+        </div>
+      `;
+      const img = shared.querySelector("img");
+      img.src = m.pin.image_url;
+      img.alt = m.pin.title;
+      shared.querySelector(".fw-semibold.text-truncate").textContent = m.pin.title;
+      const desc = shared.querySelector("small");
+      if (m.pin.description) desc.textContent = m.pin.description;
+      else desc.remove();
+      wrapper.appendChild(shared);
+    }
+    return wrapper;
+  }
 
   async function fetchAndRender() {
     try {
-      const res = await fetch(`/api/messages_for/${otherId}`);
+      const url = lastId === null
+        ? `/api/messages_for/${otherId}`
+        : `/api/messages_for/${otherId}?after_id=${lastId}`;
+      const res = await fetch(url);
       const data = await res.json();
-      const jsonString = JSON.stringify(data.messages);
-      if (jsonString === lastJson) {
-        return;
+
+      const isDelta = lastId !== null;
+      if (!isDelta) {
+        container.innerHTML = "";
+        lastId = 0;
+        hasMore = data.has_more;
+        if (data.messages.length) firstId = data.messages[0].id;
       }
-      lastJson = jsonString;
+      if (data.messages.length === 0) return;
 
-      container.innerHTML = "";
       data.messages.forEach(m => {
-        const wrapper = document.createElement("div");
-        wrapper.className = "mb-2";
-
-        const who = m.from_me ? "You" : data.other_username;
-        let inner = `<strong>${who}:</strong> `;
-        if (m.text) {
-          inner += m.text;
-        }
-        if (m.pin) {
-          inner += `
-            <div class="mt-1 p-2 border rounded small">
-              <div class="fw-semibold mb-1">Shared pin:</div>
-              <div class="d-flex align-items-center gap-2">
-                <img src="${m.pin.image_url}"
-                     alt="${m.pin.title}"
-                     class="shared-pin-thumb">
-                <div>
-                  <div class="fw-semibold text-truncate">${m.pin.title}</div>
-                  ${m.pin.description ? `<small class="text-muted d-block text-truncate">${m.pin.description}</small>` : ""}
-                </div>
-              </div>
-            </div>
-          `;
-        }
-
-        wrapper.innerHTML = inner;
-        container.appendChild(wrapper);
+        container.appendChild(renderMessage(m, data.other_username));
+        lastId = Math.max(lastId, m.id);
       });
 
       container.scrollTop = container.scrollHeight;
+      // deltas are capped; fetch the rest right away
+      if (isDelta && data.has_more) fetchAndRender();
     } catch (err) {
       console.error("poll messages error", err);
     }
   }
 
-  fetchAndRender();
-  setInterval(fetchAndRender, 3000);
+  // older history, prepended when the user scrolls to the top
+  async function loadOlder() {
+    if (!hasMore || loadingOlder || firstId === null) return;
+    loadingOlder = true;
+    try {
+      const res = await fetch(`/api/messages_for/${otherId}?before_id=${firstId}`);
+      const data = await res.json();
+      const previousHeight = container.scrollHeight;
+      const fragment = document.createDocumentFragment();
+      data.messages.forEach(m => fragment.appendChild(renderMessage(m, data.other_username)));
+      container.prepend(fragment);
+      // keep the message that was at the top where it was
+      container.scrollTop += container.scrollHeight - previousHeight;
+      if (data.messages.length) firstId = data.messages[0].id;
+      hasMore = data.has_more;
+    } catch (err) {
+      console.error("load older messages error", err);
+    } finally {
+      loadingOlder = false;
+    }
+  }
+
+  container.addEventListener("scroll", () => {
+    if (container.scrollTop < 40) loadOlder();
+  });
+
+  if (stream) {
+    stream.addEventListener("open", fetchAndRender);
+    stream.addEventListener("message_created", (e) => {
+      const data = JSON.parse(e.data);
+      if (data.sender_id == otherId || data.recipient_id == otherId) {
+        fetchAndRender();
+      }
+    });
+  }
+
+  // with a stream the "open" handler does the first load
+  if (!stream) fetchAndRender();
+  setInterval(() => {
+    if (!streamConnected(stream)) fetchAndRender();
+  }, 3000);
+}
+
+// rendered card width per breakpoint, mirrors .pin-grid column-count
+const PIN_CARD_SIZES = "(max-width: 600px) 100vw, (max-width: 1000px) 50vw, (max-width: 1400px) 33vw, 25vw";
+
+// markup for a single feed card
+// Builds a feed card. Only server-generated values (ids, URLs, numbers) go
+// into the markup; title, description and author are set as text. Clicks on
+// the image open the modal through the delegated handler in base.html.
+function pinCard(pin) {
+  const card = document.createElement("div");
+  card.className = "pin-card";
+  card.innerHTML = `
+    <div class="pin-card-img-wrapper" style="cursor: zoom-in;">
+      <img src="${pin.thumb_url}"
+           ${pin.srcset ? `srcset="${pin.srcset}" sizes="${PIN_CARD_SIZES}"` : ""}
+           ${pin.width ? `width="${pin.width}" height="${pin.height}"` : ""}
+           ${pin.dominant_color ? `style="background-color: ${pin.dominant_color};"` : ""}
+           data-full="${pin.image_url}"
+           loading="lazy" class="pin-card-img">
+      <div class="pin-card-overlay">
+        <div class="d-flex justify-content-end w-100">
+          <button type="button" class="action-btn save-btn ${pin.saved ? "active" : ""}" data-pin="${pin.id}">
+            <span class="save-icon">${pin.saved ? "Saved" : "Save"}</span>
+          </button>
+        </div>
+        <div class="d-flex justify-content-between align-items-end w-100 mt-auto">
+          <button class="action-btn share-btn" type="button" data-pin="${pin.id}">
+            <span class="icon">📤</span>
+          </button>
+        </div>
+      </div>
+    </div>
+    
+    <div class="pin-card-body">
+      <div class="pin-title"></div>
+      <div class="pin-desc"></div>
+      
+      <div class="d-flex justify-content-between align-items-center mt-3">
+        <div class="pin-author">
+          <div class="author-avatar"></div>
+          <span></span>
+        </div>
+        <button type="button" class="action-btn like-btn ${pin.liked ? "active" : ""}" data-pin="${pin.id}">
+          <span class="like-icon">${pin.liked ? "♥" : "♡"}</span>
+          <span class="like-count">${pin.likes_count}</span>
+        </button>
+      </div>
+
+      <div class="share-popup d-none" id="sharePopup-${pin.id}">
+        <div class="share-popup-inner">
+          <input type="text"
+                 class="form-control form-control-sm user-search-input"
+                 placeholder="Search user..."
+                 data-pin="${pin.id}">
+          <div class="user-search-results mt-2"
+               id="searchResults-${pin.id}"></div>
+        </div>
+      </div>
+    </div>
+  `;
+  card.querySelector(".pin-card-img").alt = pin.title;
+  card.querySelector(".pin-title").textContent = pin.title;
+  const desc = card.querySelector(".pin-desc");
+  if (pin.description) desc.textContent = pin.description;
+  else desc.remove();
+  card.querySelector(".author-avatar").textContent = pin.author ? pin.author[0].toUpperCase() : "U";
+  card.querySelector(".pin-author span").textContent = pin.author;
+  return card;
 }
 
-// polling: keep Home feed pins updated
-function startPinsPolling(container) {
+// keep Home feed pins updated
+// The feed is paginated: older pages are fetched with `next_cursor` as the
+// user scrolls down. Refreshes after the first load ask only for the delta
+// (new pins + changed like counts) and merge it into what is loaded; with a
+// live stream they run only when a new pin is pushed.
+function startPinsPolling(container, stream) {
+  let pins = [];
+  let nextCursor = null;
+  let loadingMore = false;
   let lastJson = null;
+  let serverTime = null;
+
+  function currentQuery() {
+    const searchInput = document.getElementById("globalSearchInput");
+    return searchInput ? searchInput.value.trim() : "";
+  }
+
+  function render() {
+    const jsonString = JSON.stringify(pins);
+    if (jsonString === lastJson) return;
+    lastJson = jsonString;
+
+    container.innerHTML = "";
+    pins.forEach(pin => container.appendChild(pinCard(pin)));
+
+    attachShareHandlers();
+    attachLikeSaveHandlers();
+  }
+
+  async function fetchDelta() {
+    const afterId = pins.reduce((max, p) => Math.max(max, p.id), 0);
+    const url = "/api/pins?q=" + encodeURIComponent(currentQuery()) +
+      "&after_id=" + afterId + "&since=" + encodeURIComponent(serverTime);
+    const res = await fetch(url);
+    const data = await res.json();
+    if (data.reset) return false;
+
+    // an idle poll keeps its URL, so the browser can revalidate it (304)
+    if (data.pins.length || data.likes.length) serverTime = data.server_time;
+    const changed = new Map(data.likes.map(c => [c.id, c]));
+    pins = data.pins.concat(pins.map(p =>
+      changed.has(p.id) ? Object.assign({}, p, changed.get(p.id)) : p
+    ));
+    return true;
+  }
 
   window.fetchAndRenderPinsGlobal = async function(force = false) {
     try {
-      const searchInput = document.getElementById("globalSearchInput");
-      const q = searchInput ? searchInput.value.trim() : "";
-      
-      const res = await fetch("/api/pins?q=" + encodeURIComponent(q));
+      if (force || serverTime === null || !(await fetchDelta())) {
+        const res = await fetch("/api/pins?q=" + encodeURIComponent(currentQuery()));
+        const data = await res.json();
+        pins = data.pins;
+        nextCursor = data.next_cursor;
+        serverTime = data.server_time;
+      }
+
+      render();
+    } catch (err) {
+      console.error("poll pins error", err);
+    }
+  };
+
+  async function loadMore() {
+    if (loadingMore || !nextCursor) return;
+    loadingMore = true;
+    try {
+      const url = "/api/pins?q=" + encodeURIComponent(currentQuery()) +
+        "&cursor=" + encodeURIComponent(nextCursor);
+      const res = await fetch(url);
       const data = await res.json();
-      const jsonString = JSON.stringify(data.pins);
-      if (jsonString === lastJson && !force) return;
-      lastJson = jsonString;
-
-      container.innerHTML = "";
-      data.pins.forEach(pin => {
-        const card = document.createElement("div");
-        card.className = "pin-card";
-        const authorInitial = pin.author ? pin.author[0].toUpperCase() : 'U';
-        card.innerHTML = `
-          <div class="pin-card-img-wrapper" style="cursor: zoom-in;" onclick="window.openPinModal('${pin.id}', '${pin.image_url}', '${pin.title.replace(/'/g, "\\'")}', '${(pin.description || "").replace(/'/g, "\\'")}', '${pin.author.replace(/'/g, "\\'")}', '${authorInitial}')">
-            <img src="${pin.image_url}" class="pin-card-img" alt="${pin.title}">
-            <div class="pin-card-overlay">
-              <div class="d-flex justify-content-end w-100">
-                <button type="button" class="action-btn save-btn ${pin.saved ? "active" : ""}" data-pin="${pin.id}">
-                  <span class="save-icon">${pin.saved ? "Saved" : "Save"}</span>
-                </button>
-              </div>
-              <div class="d-flex justify-content-between align-items-end w-100 mt-auto">
-                <button class="action-btn share-btn" type="button" data-pin="${pin.id}">
-                  <span class="icon">📤</span>
-                </button>
-              </div>
-            </div>
-          </div>
-          
-          <div class="pin-card-body">
-            <div class="pin-title">${pin.title}</div>
-            ${pin.description ? `<div class="pin-desc">${pin.description}</div>` : ""}
-            
-            <div class="d-flex justify-content-between align-items-center mt-3">
-              <div class="pin-author">
-                <div class="author-avatar">${authorInitial}</div>
-                <span>${pin.author}</span>
-              </div>
-              <button type="button" class="action-btn like-btn ${pin.liked ? "active" : ""}" data-pin="${pin.id}">
-                <span class="like-icon">${pin.liked ? "♥" : "♡"}</span>
-                <span class="like-count">${pin.likes_count}</span>
-              </button>
-            </div>
-
-            <div class="share-popup d-none" id="sharePopup-${pin.id}">
-              <div class="share-popup-inner">
-                <input type="text"
-                       class="form-control form-control-sm user-search-input"
-                       placeholder="Search user..."
-                       data-pin="${pin.id}">
-                <div class="user-search-results mt-2"
-                     id="searchResults-${pin.id}"></div>
-              </div>
-            </div>
-          </div>
-        `;
-        container.appendChild(card);
-      });
+      const seen = new Set(pins.map(p => p.id));
+      pins = pins.concat(data.pins.filter(p => !seen.has(p.id)));
+      nextCursor = data.next_cursor;
+      render();
+    } catch (err) {
+      console.error("load more pins error", err);
+    } finally {
+      loadingMore = false;
+    }
+  }
+
+  const sentinel = document.createElement("div");
+  sentinel.className = "pin-grid-sentinel";
+  container.after(sentinel);
+  new IntersectionObserver(entries => {
+    if (entries.some(e => e.isIntersecting)) loadMore();
+  }, { rootMargin: "600px" }).observe(sentinel);
+
+  function patchPin(update, rerender) {
+    pins = pins.map(p => p.id === update.id ? Object.assign({}, p, update) : p);
+    if (rerender) {
+      render();
+    } else {
+      // the clicked button already shows the new state
+      lastJson = JSON.stringify(pins);
+    }
+  }
+
+  document.addEventListener("pinboard:pin-updated", (e) => patchPin(e.detail, false));
+
+  if (stream) {
+    stream.addEventListener("open", () => window.fetchAndRenderPinsGlobal());
+    stream.addEventListener("pin_created", () => window.fetchAndRenderPinsGlobal());
+    stream.addEventListener("pin_likes", (e) => {
+      const data = JSON.parse(e.data);
+      patchPin({ id: data.id, likes_count: data.likes_count }, true);
+    });
+  }
+
+  if (!stream) window.fetchAndRenderPinsGlobal();
+  setInterval(() => {
+    if (!streamConnected(stream)) window.fetchAndRenderPinsGlobal();
+  }, 5000);
+}
+
+// Following / Explore tabs: pages of a `next_cursor` API, loaded as the
+// sentinel comes into view (so nothing is fetched until the tab is opened)
+function startPagedGrid(container, apiUrl, emptyNote) {
+  let nextCursor = null;
+  let started = false;
+  let loading = false;
+
+  async function loadPage() {
+    if (loading || (started && !nextCursor)) return;
+    loading = true;
+    try {
+      const url = apiUrl +
+        (nextCursor ? "?cursor=" + encodeURIComponent(nextCursor) : "");
+      const res = await fetch(url);
+      const data = await res.json();
+      started = true;
+      nextCursor = data.next_cursor;
+
+      data.pins.forEach(pin => container.appendChild(pinCard(pin)));
+      if (emptyNote) emptyNote.classList.toggle("d-none", container.children.length > 0);
 
       attachShareHandlers();
       attachLikeSaveHandlers();
     } catch (err) {
-      console.error("poll pins error", err);
+      console.error("paged grid error", err);
+    } finally {
+      loading = false;
     }
-  };
+  }
+
+  const sentinel = document.createElement("div");
+  sentinel.className = "pin-grid-sentinel";
+  container.after(sentinel);
+  new IntersectionObserver(entries => {
+    if (entries.some(e => e.isIntersecting)) loadPage();
+  }, { rootMargin: "600px" }).observe(sentinel);
+}
+
+// Boards tab: the list is server-rendered from board rows (count + cover);
+// opening a board pages its pins, and adding/removing several pins is one
+// bulk request.
+function startBoards(section) {
+  const list = section.querySelector("#boardList");
+  const detail = section.querySelector("#boardDetail");
+  const grid = section.querySelector("#boardPinGrid");
+  const pickToggle = section.querySelector("#boardPickToggle");
+  const addSelected = section.querySelector("#boardAddSelected");
+  let boardId = null;
+  let picking = false;
+
+  // built node by node: titles are user input
+  function pickCard(pin) {
+    const card = document.createElement("label");
+    card.className = "pin-card d-block";
+    card.style.cursor = "pointer";
+
+    const img = document.createElement("img");
+    img.src = pin.thumb_url;
+    img.className = "pin-card-img";
+    img.loading = "lazy";
+    img.alt = pin.title;
+    if (pin.dominant_color) img.style.backgroundColor = pin.dominant_color;
+
+    const body = document.createElement("div");
+    body.className = "pin-card-body d-flex align-items-center gap-2";
+    const box = document.createElement("input");
+    box.type = "checkbox";
+    box.className = "form-check-input board-pick";
+    box.value = pin.id;
+    const title = document.createElement("span");
+    title.className = "pin-title";
+    title.textContent = pin.title;
+    body.append(box, title);
+
+    card.append(img, body);
+    return card;
+  }
+
+  async function showPins(url) {
+    grid.innerHTML = "";
+    try {
+      const res = await fetch(url);
+      const data = await res.json();
+      grid.replaceChildren(...data.pins.map(pickCard));
+    } catch (err) {
+      console.error("board pins error", err);
+    }
+  }
+
+  function showBoard(id, name) {
+    boardId = id;
+    picking = false;
+    section.querySelector("#boardDetailName").textContent = name;
+    pickToggle.textContent = "Add pins";
+    addSelected.classList.add("d-none");
+    list.classList.add("d-none");
+    detail.classList.remove("d-none");
+    showPins(`/api/boards/${id}/pins?limit=100`);
+  }
+
+  function selectedIds() {
+    return [...grid.querySelectorAll(".board-pick:checked")].map(cb => Number(cb.value));
+  }
+
+  async function bulk(body) {
+    const res = await fetch(`/api/boards/${boardId}/pins`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(body),
+    });
+    const data = await res.json();
+    if (!data.ok) {
+      showToast(data.error || "Could not update the board.", true);
+      return;
+    }
+    const tile = list.querySelector(`[data-board="${boardId}"] .board-pin-count`);
+    if (tile) tile.textContent = data.pin_count;
+    showToast(data.added ? `Added ${data.added} pins.` : `Removed ${data.removed} pins.`);
+    picking = false;
+    pickToggle.textContent = "Add pins";
+    addSelected.classList.add("d-none");
+    showPins(`/api/boards/${boardId}/pins?limit=100`);
+  }
+
+  list.addEventListener("click", (e) => {
+    const tile = e.target.closest(".board-tile");
+    if (tile) showBoard(tile.dataset.board, tile.querySelector(".fw-semibold").textContent);
+  });
+
+  section.querySelector("#boardBack").addEventListener("click", () => {
+    detail.classList.add("d-none");
+    list.classList.remove("d-none");
+  });
 
-  window.fetchAndRenderPinsGlobal();
-  setInterval(window.fetchAndRenderPinsGlobal, 5000);
+  // "Add pins" swaps the grid for the newest feed pins to pick from
+  pickToggle.addEventListener("click", () => {
+    picking = !picking;
+    pickToggle.textContent = picking ? "Cancel" : "Add pins";
+    addSelected.classList.toggle("d-none", !picking);
+    showPins(picking ? "/api/pins?limit=60" : `/api/boards/${boardId}/pins?limit=100`);
+  });
+
+  addSelected.addEventListener("click", () => {
+    const ids = selectedIds();
+    if (ids.length) bulk({ add: ids });
+  });
+
+  section.querySelector("#boardRemoveSelected").addEventListener("click", () => {
+    const ids = selectedIds();
+    if (ids.length && !picking) bulk({ remove: ids });
+  });
+
+  section.querySelector("#boardDelete").addEventListener("click", async () => {
+    if (!confirm("Delete this board?")) return;
+    const res = await fetch(`/api/boards/${boardId}`, { method: "DELETE" });
+    if (res.ok) window.location.href = "/dashboard?tab=boards";
+  });
+
+  section.querySelector("#boardCreateForm").addEventListener("submit", async (e) => {
+    e.preventDefault();
+    const input = section.querySelector("#boardNameInput");
+    const res = await fetch("/api/boards", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ name: input.value }),
+    });
+    const data = await res.json();
+    if (data.ok) {
+      window.location.href = "/dashboard?tab=boards";
+    } else {
+      showToast(data.error, true);
+    }
+  });
+}
+
+// Upload in chunks (app/uploads.py) so a dropped connection resumes where
+// it stopped; a reload resumes the same file too. The form's plain POST
+// is the fallback without JS.
+function startChunkedUpload(form) {
+  const fileInput = form.querySelector("#uploadInput");
+  const button = form.querySelector("button[type=submit]");
+  const MAX_RETRIES = 5;
+
+  const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+  const resumeKey = file => `upload:${file.name}:${file.size}:${file.lastModified}`;
+
+  async function api(url, options) {
+    const res = await fetch(url, options);
+    return { status: res.status, data: await res.json() };
+  }
+
+  async function begin(file) {
+    const saved = localStorage.getItem(resumeKey(file));
+    if (saved) {
+      const { status, data } = await api(`/api/uploads/${saved}`);
+      if (status === 200) return { id: saved, offset: data.offset, chunkSize: data.chunk_size };
+      localStorage.removeItem(resumeKey(file));
+    }
+    const { data } = await api("/api/uploads", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ size: file.size }),
+    });
+    if (!data.ok) throw new Error(data.error);
+    localStorage.setItem(resumeKey(file), data.id);
+    return { id: data.id, offset: 0, chunkSize: data.chunk_size };
+  }
+
+  async function send(file, upload) {
+    let { offset } = upload;
+    let retries = 0;
+    while (offset < file.size) {
+      button.textContent = `Uploading ${Math.floor((offset / file.size) * 100)}%`;
+      try {
+        const { status, data } = await api(`/api/uploads/${upload.id}?offset=${offset}`, {
+          method: "PUT",
+          body: file.slice(offset, offset + upload.chunkSize),
+        });
+        if (status === 400) throw Object.assign(new Error(data.error), { fatal: true });
+        offset = data.offset;  // on 409 too: continue from what the server has
+        retries = 0;
+      } catch (err) {
+        if (err.fatal || ++retries > MAX_RETRIES) throw err;
+        await sleep(1000 * 2 ** retries);
+        try {
+          offset = (await api(`/api/uploads/${upload.id}`)).data.offset;
+        } catch (_) {
+          // still offline; the next PUT attempt retries
+        }
+      }
+    }
+  }
+
+  form.addEventListener("submit", async (e) => {
+    const file = fileInput.files && fileInput.files[0];
+    if (!file) return;
+    e.preventDefault();
+    button.disabled = true;
+    const label = button.textContent;
+    try {
+      const upload = await begin(file);
+      await send(file, upload);
+      const fields = new FormData(form);
+      fields.delete("image");  // already on the server
+      const { data } = await api(`/api/uploads/${upload.id}/finish`, {
+        method: "POST",
+        body: fields,
+      });
+      if (!data.ok) throw new Error(data.error);
+      localStorage.removeItem(resumeKey(file));
+      window.location.href = data.redirect;
+    } catch (err) {
+      showToast(err.message || "Upload failed.", true);
+      button.disabled = false;
+      button.textContent = label;
+    }
+  });
 }
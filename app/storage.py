@@ -0,0 +1,159 @@
+"""Content-addressed upload storage.
+
+Files are named after the SHA-256 of their bytes and sharded two levels
+deep (uploads/ab/cd/abcd....jpg), so identical uploads share one file
+and a given URL never changes content. Blob rows count the pins and board
+covers pointing at each file; the file goes away with its last reference.
+
+Storing and deleting the same file can race (a pin released in the worker
+while someone uploads the same image), so both go through the Blob row:
+store_* takes its reference *before* deciding the file is already there,
+and delete_unused removes the row and the file in one transaction, only
+while ref_count is still zero. The row's lock orders the two: a store
+either counts before the delete checks, or waits for it and writes the
+file again.
+"""
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .models import Blob
+
+CHUNK_SIZE = 64 * 1024
+INCOMING_DIR = ".incoming"
+
+# extensions that are the same format, so the same bytes get one name
+_CANONICAL_EXT = {"jpeg": "jpg"}
+
+
+def canonical_ext(ext):
+    ext = ext.lower()
+    return _CANONICAL_EXT.get(ext, ext)
+
+
+def shard_path(digest, ext):
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{canonical_ext(ext)}"
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _place(tmp_path, digest, upload_folder, ext):
+    relpath = shard_path(digest, ext)
+    # reference first: from here on delete_unused won't remove the file
+    acquire(relpath)
+    final = os.path.join(upload_folder, relpath)
+    if os.path.exists(final):
+        os.remove(tmp_path)
+        return relpath, False
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+    os.replace(tmp_path, final)
+    return relpath, True
+
+
+def store_stream(stream, upload_folder, ext):
+    """Copy `stream` to its content address, hashing while writing.
+
+    Takes one reference to the file (see acquire); the caller commits.
+    Returns (relative filename, created); created is False when an identical
+    file was already stored and the write was skipped.
+    """
+    incoming = os.path.join(upload_folder, INCOMING_DIR)
+    os.makedirs(incoming, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=incoming, delete=False) as tmp:
+        try:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            os.remove(tmp.name)
+            raise
+    return _place(tmp.name, digest.hexdigest(), upload_folder, ext)
+
+
+def store_file(path, upload_folder, ext):
+    """Move a local file to its content address (see store_stream)."""
+    return store_staged(stage(path, ext), upload_folder)
+
+
+class Staged(namedtuple("Staged", "path digest ext")):
+    """A finished temp file, hashed but not yet stored.
+
+    Pool processes stage what they make and the worker thread stores it,
+    since only that thread can take the blob reference first.
+    """
+
+    @property
+    def filename(self):
+        return shard_path(self.digest, self.ext)
+
+
+def stage(path, ext):
+    return Staged(path, file_digest(path), ext)
+
+
+def store_staged(staged, upload_folder):
+    """Store a Staged file (see store_stream)."""
+    return _place(staged.path, staged.digest, upload_folder, staged.ext)
+
+
+def acquire(filename):
+    """Count one more reference to `filename`. store_* call this; the row
+    stays locked until the caller's transaction commits."""
+    updated = Blob.query.filter_by(filename=filename).update(
+        {Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False
+    )
+    if updated:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(Blob(filename=filename, ref_count=1))
+    except IntegrityError:
+        # another request stored the same image at the same moment
+        Blob.query.filter_by(filename=filename).update(
+            {Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False
+        )
+
+
+def release(filename):
+    """Drop one reference. Returns True if that was the last one.
+
+    The row stays at zero; the caller passes the filename to delete_unused
+    after committing.
+    """
+    Blob.query.filter_by(filename=filename).update(
+        {Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False
+    )
+    remaining = Blob.query.with_entities(Blob.ref_count).filter_by(filename=filename).scalar()
+    return remaining is not None and remaining <= 0
+
+
+def delete_unused(upload_folder, filename, variants=()):
+    """Remove a released file and its resized variants if nothing took a
+    new reference since. Commits; call it after the release is committed.
+
+    The conditional DELETE locks the row, so a concurrent store waits in
+    acquire() until the files are gone, then finds no row and writes the
+    file again.
+    """
+    gone = Blob.query.filter(Blob.filename == filename, Blob.ref_count <= 0).delete(
+        synchronize_session=False
+    )
+    if gone:
+        for relpath in (filename, *variants):
+            try:
+                os.remove(os.path.join(upload_folder, relpath))
+            except FileNotFoundError:
+                pass
+    db.session.commit()
+    return bool(gone)
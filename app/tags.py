@@ -0,0 +1,90 @@
+"""Parsing free-form tag input into normalized Tag rows."""
+import re
+
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .models import Tag, pin_tags
+
+_TAG_RE = re.compile(r"[\w-]+", re.UNICODE)
+MAX_TAGS_PER_PIN = 10
+MAX_TAG_LENGTH = 50
+
+
+def parse_tags(raw):
+    """'#Design, #ui  inspo' -> ['design', 'ui', 'inspo'] (deduped, in order)."""
+    names = []
+    for name in _TAG_RE.findall((raw or "").lower()):
+        name = name.strip("-")[:MAX_TAG_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names[:MAX_TAGS_PER_PIN]
+
+
+def get_or_create_tags(names):
+    """Tag rows for `names`, creating the missing ones."""
+    if not names:
+        return []
+    tags = {t.name: t for t in Tag.query.filter(Tag.name.in_(names))}
+    for name in names:
+        if name in tags:
+            continue
+        try:
+            with db.session.begin_nested():
+                tag = Tag(name=name)
+                db.session.add(tag)
+        except IntegrityError:
+            # created concurrently by another request
+            tag = Tag.query.filter_by(name=name).one()
+        tags[name] = tag
+    return [tags[name] for name in names]
+
+
+def attach_tags(pin, raw):
+    """Link `pin` to the tags in `raw` and bump their popularity counters.
+
+    Call before the surrounding commit; the pin must not have tags yet.
+    """
+    tags = get_or_create_tags(parse_tags(raw))
+    if not tags:
+        return []
+    pin.tag_list = tags
+    db.session.flush()
+    Tag.query.filter(Tag.id.in_([t.id for t in tags])).update(
+        {Tag.pin_count: Tag.pin_count + 1}, synchronize_session=False
+    )
+    return tags
+
+
+def backfill_tags(batch_size=500):
+    """Parse `Pin.tags` for pins with no pin_tags rows and recount Tag.pin_count."""
+    from .models import Pin
+
+    tagged = db.session.query(pin_tags.c.pin_id)
+    count, last_id = 0, 0
+    while True:
+        batch = (
+            Pin.query.filter(Pin.id > last_id, Pin.tags.isnot(None), Pin.id.notin_(tagged))
+            .order_by(Pin.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        for pin in batch:
+            tags = get_or_create_tags(parse_tags(pin.tags))
+            if tags:
+                pin.tag_list = tags
+                count += 1
+        last_id = batch[-1].id
+        db.session.commit()
+
+    usage = (
+        db.select(db.func.count())
+        .select_from(pin_tags)
+        .where(pin_tags.c.tag_id == Tag.id)
+        .scalar_subquery()
+    )
+    db.session.execute(db.update(Tag).values(pin_count=usage))
+    db.session.commit()
+    return count
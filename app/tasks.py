@@ -0,0 +1,89 @@
+"""Background job handlers. Imported by create_app so they register."""
+import os
+from datetime import datetime
+
+from flask import current_app
+
+from . import boards, db, events, storage
+from .images import process_upload, render_collage
+from .jobs import enqueue, handler
+from .models import Board, Pin, board_pins
+from .timeline import fan_out_pin
+
+
+def _mark_failed(pin_id):
+    Pin.query.filter_by(id=pin_id).update(
+        {Pin.processing_state: "failed", Pin.updated_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+
+
+@handler("process_pin_image", on_give_up=_mark_failed)
+def process_pin_image(cpu_pool, pin_id):
+    """Strip EXIF, build resized variants and record image metadata."""
+    pin = db.session.get(Pin, pin_id)
+    if pin is None:
+        return
+
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    try:
+        meta = cpu_pool.submit(process_upload, upload_folder, pin.image_filename).result()
+    except OSError:
+        # not a decodable image (or gone); retrying won't help
+        _mark_failed(pin.id)
+        db.session.commit()
+        return
+
+    # stripping EXIF changes the bytes and so the content address
+    unused = None
+    staged = meta.pop("staged")
+    if staged:
+        storage.store_staged(staged, upload_folder)
+        if storage.release(pin.image_filename):
+            unused = pin.image_filename
+
+    for key, value in meta.items():
+        setattr(pin, key, value)
+    pin.processing_state = "ready"
+    pin.updated_at = datetime.utcnow()  # feed pollers pick up the new srcset
+    # boards it was added to while processing can show it on their cover now
+    for (board_id,) in db.session.query(board_pins.c.board_id).filter_by(pin_id=pin.id):
+        enqueue("build_board_cover", board_id=board_id)
+    db.session.commit()
+    if unused:
+        storage.delete_unused(upload_folder, unused)
+    events.publish("feed", "pin_processed", id=pin.id)
+
+
+@handler("fan_out_pin")
+def fan_out_pin_job(cpu_pool, pin_id):
+    """Copy a new pin into its author's followers' timelines."""
+    fan_out_pin(pin_id)
+    db.session.commit()
+
+
+@handler("build_board_cover")
+def build_board_cover(cpu_pool, board_id):
+    """Re-render a board's cover collage from its newest pins."""
+    board = db.session.get(Board, board_id)
+    if board is None:
+        return
+
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    sources = boards.cover_sources(board.id)
+    staged = cpu_pool.submit(render_collage, upload_folder, sources).result() if sources else None
+    cover = staged.filename if staged else None
+    if cover == board.cover_filename:
+        if staged:
+            os.remove(staged.path)
+        return
+
+    if staged:
+        storage.store_staged(staged, upload_folder)
+    unused = None
+    if board.cover_filename and storage.release(board.cover_filename):
+        unused = board.cover_filename
+    board.cover_filename = cover
+    db.session.commit()
+    if unused:
+        storage.delete_unused(upload_folder, unused)
@@ -0,0 +1,119 @@
+"""Following feed with fan-out on write.
+
+When a pin is uploaded, the `fan_out_pin` job copies its id into the
+`timeline` row set of every follower of the author, so reading the feed
+is one range scan of timeline's (user_id, pin_id) primary key.
+
+Authors with more than FANOUT_MAX_FOLLOWERS followers are skipped at
+write time (one upload would mean that many inserts); their pins are
+merged in when the feed is read instead, which is cheap because a reader
+follows few such accounts.
+"""
+from sqlalchemy import delete, insert, select
+
+from . import db
+from .models import Pin, User, followers, insert_ignore, timeline
+
+FANOUT_MAX_FOLLOWERS = 10000
+# pins copied into a timeline when someone follows an author
+BACKFILL_ON_FOLLOW = 100
+
+
+def is_following(user_id, other_id):
+    return db.session.execute(
+        select(followers.c.follower_id).where(
+            followers.c.follower_id == user_id, followers.c.followed_id == other_id
+        )
+    ).first() is not None
+
+
+def fan_out_pin(pin_id):
+    """Add `pin_id` to its author's followers' timelines. Returns rows added."""
+    pin = db.session.get(Pin, pin_id)
+    if pin is None or pin.author.follower_count > FANOUT_MAX_FOLLOWERS:
+        return 0
+    result = db.session.execute(
+        insert(timeline).from_select(
+            ["user_id", "pin_id"],
+            select(followers.c.follower_id, db.literal(pin.id))
+            .where(followers.c.followed_id == pin.user_id)
+            # a retried job must not collide with what it already inserted
+            .where(~select(timeline.c.user_id).where(
+                timeline.c.user_id == followers.c.follower_id,
+                timeline.c.pin_id == pin.id,
+            ).exists()),
+        )
+    )
+    return result.rowcount
+
+
+def follow(user_id, other_id):
+    """Start following; returns False if already following."""
+    # a double-click's second request finds the row and inserts nothing
+    if not insert_ignore(followers, follower_id=user_id, followed_id=other_id):
+        return False
+    User.query.filter_by(id=other_id).update(
+        {User.follower_count: User.follower_count + 1}, synchronize_session=False
+    )
+    # the column itself, not the identity map's copy from before the update
+    follower_count = db.session.scalar(select(User.follower_count).where(User.id == other_id))
+    if follower_count <= FANOUT_MAX_FOLLOWERS:
+        recent = (
+            select(db.literal(user_id), Pin.id)
+            .where(Pin.user_id == other_id)
+            # fan_out_pin may have just delivered one of them
+            .where(~select(timeline.c.user_id).where(
+                timeline.c.user_id == user_id,
+                timeline.c.pin_id == Pin.id,
+            ).exists())
+            .order_by(Pin.id.desc())
+            .limit(BACKFILL_ON_FOLLOW)
+        )
+        db.session.execute(insert(timeline).from_select(["user_id", "pin_id"], recent))
+    return True
+
+
+def unfollow(user_id, other_id):
+    """Stop following; returns False if not following."""
+    removed = db.session.execute(
+        delete(followers).where(
+            followers.c.follower_id == user_id, followers.c.followed_id == other_id
+        )
+    ).rowcount
+    if not removed:
+        return False
+    User.query.filter_by(id=other_id).update(
+        {User.follower_count: User.follower_count - 1}, synchronize_session=False
+    )
+    db.session.execute(
+        delete(timeline).where(
+            timeline.c.user_id == user_id,
+            timeline.c.pin_id.in_(select(Pin.id).where(Pin.user_id == other_id)),
+        )
+    )
+    return True
+
+
+def feed_ids(user_id, before=None, limit=30):
+    """Newest-first pin ids for `user_id`'s following feed.
+
+    Returns (ids, has_more). `before` is the last id of the previous page.
+    """
+    query = select(timeline.c.pin_id).where(timeline.c.user_id == user_id)
+    if before is not None:
+        query = query.where(timeline.c.pin_id < before)
+    ids = set(db.session.scalars(query.order_by(timeline.c.pin_id.desc()).limit(limit + 1)))
+
+    # fan-out on read for the big accounts this user follows
+    big_accounts = select(followers.c.followed_id).join(
+        User, User.id == followers.c.followed_id
+    ).where(
+        followers.c.follower_id == user_id, User.follower_count > FANOUT_MAX_FOLLOWERS
+    )
+    query = select(Pin.id).where(Pin.user_id.in_(big_accounts))
+    if before is not None:
+        query = query.where(Pin.id < before)
+    ids.update(db.session.scalars(query.order_by(Pin.id.desc()).limit(limit + 1)))
+
+    ids = sorted(ids, reverse=True)
+    return ids[:limit], len(ids) > limit
@@ -0,0 +1,94 @@
+"""Trending pins: a time-decayed engagement score kept up to date on write.
+
+A like, save or comment made at time t is worth
+
+    WEIGHTS[kind] * 2 ** ((t - TRENDING_EPOCH) / half_life)
+
+in Pin.trending_score. As time passes every pin's score would decay by
+the same factor, so rather than decaying all rows, newer events are
+scaled up: sorting by the stored column is sorting by the decayed score,
+and the (trending_score, id) index serves /api/explore directly. Writes
+only touch the pin concerned; undoing an event (unlike, unsave) subtracts
+what it added.
+
+Stored values double every half-life; at the 48h default they stay well
+inside float range for about five years after TRENDING_EPOCH. Nearing
+that, a warning is logged; past it the exponent is capped (new events
+stop outranking old ones, but writes keep working) until the epoch is
+moved forward. After moving the epoch or changing the half-life,
+`flask backfill-trending` recomputes every score from the event tables.
+"""
+import logging
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from . import db
+from .models import Comment, Like, Pin, SavedPin
+
+WEIGHTS = {"like": 1.0, "save": 2.0, "comment": 1.5}
+BACKFILL_BATCH = 1000
+# 2 ** 1024 overflows a float; sums of many events need headroom below it
+MAX_EXPONENT = 960
+WARN_EXPONENT = 900
+
+log = logging.getLogger(__name__)
+_warned = False
+
+
+def decay_settings():
+    """(epoch, half-life in seconds) from the app config."""
+    config = current_app.config
+    return (
+        datetime.fromisoformat(config["TRENDING_EPOCH"]),
+        config["TRENDING_HALF_LIFE_HOURS"] * 3600.0,
+    )
+
+
+def contribution(kind, at=None, settings=None):
+    """What one `kind` event at `at` (default now) adds to trending_score."""
+    global _warned
+    epoch, half_life = settings or decay_settings()
+    exponent = ((at or datetime.utcnow()) - epoch).total_seconds() / half_life
+    if exponent > WARN_EXPONENT and not _warned:
+        _warned = True
+        log.warning(
+            "trending scores are %.0f half-lives past TRENDING_EPOCH (limit %d); "
+            "move TRENDING_EPOCH forward and run `flask backfill-trending`",
+            exponent, MAX_EXPONENT,
+        )
+    # past this, every newer event counts the same instead of overflowing
+    return WEIGHTS[kind] * 2.0 ** min(exponent, MAX_EXPONENT)
+
+
+def recorded(kind, created_at, settings=None):
+    """What an existing event contributed. Rows without created_at are
+    scored at the epoch, as backfill() does, so undoing them can't take
+    more than they added."""
+    settings = settings or decay_settings()
+    return contribution(kind, created_at or settings[0], settings)
+
+
+def current_score(pin, now=None):
+    """pin.trending_score decayed to `now`, in the units of WEIGHTS."""
+    return pin.trending_score / contribution("like", now)
+
+
+def backfill():
+    """Recompute every pin's score from likes, saves and comments. Returns pins scored."""
+    settings = decay_settings()
+    scores = {}
+    for kind, model in (("like", Like), ("save", SavedPin), ("comment", Comment)):
+        rows = db.session.execute(
+            select(model.pin_id, model.created_at).execution_options(yield_per=BACKFILL_BATCH)
+        )
+        for pin_id, created_at in rows:
+            scores[pin_id] = scores.get(pin_id, 0.0) + recorded(kind, created_at, settings)
+
+    db.session.execute(update(Pin).values(trending_score=0.0))
+    values = [{"id": pid, "trending_score": score} for pid, score in scores.items()]
+    for i in range(0, len(values), BACKFILL_BATCH):
+        db.session.execute(update(Pin), values[i:i + BACKFILL_BATCH])
+    db.session.commit()
+    return len(values)
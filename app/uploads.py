@@ -0,0 +1,144 @@
+"""Chunked, resumable pin image uploads.
+
+    POST   /api/uploads              {"size": n}  -> {"id", "offset": 0, "chunk_size"}
+    PUT    /api/uploads/<id>?offset=k raw bytes   -> {"offset"}
+    GET    /api/uploads/<id>                      -> {"offset", "size"}
+    POST   /api/uploads/<id>/finish  title, description, tags -> the pin
+    DELETE /api/uploads/<id>
+
+Chunks are copied from the request stream straight onto the end of a
+.part file under the upload folder, CHUNK_SIZE bytes at a time, so a
+request holds a worker only as long as one chunk takes and memory doesn't
+grow with the file. The .part file's length is the upload's offset: after
+a disconnect, even halfway through a chunk, the client asks for it and
+carries on from there. A client sends one upload's chunks one at a time;
+a chunk that arrives while another is being written (a retry racing the
+original) is refused with OffsetMismatch rather than appended twice.
+
+The format comes from the first bytes (MAGIC), checked as soon as they
+arrive, not from the file name; anything else is refused before the rest
+is sent. Uploads never finished are removed by `flask prune-uploads`.
+"""
+import fcntl
+import os
+import secrets
+from datetime import datetime
+
+from . import db
+from .models import Upload
+from .storage import CHUNK_SIZE, INCOMING_DIR, store_file
+
+# what the client is told to send per PUT; any size up to MAX_CONTENT_LENGTH works
+CLIENT_CHUNK_SIZE = 1024 * 1024
+MAGIC = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+SNIFF_BYTES = max(len(m) for m, _ in MAGIC)
+
+
+class OffsetMismatch(Exception):
+    """The client's offset isn't where the upload ends (`offset`)."""
+
+    def __init__(self, offset):
+        super().__init__("Offset does not match.")
+        self.offset = offset
+
+
+def sniff(head):
+    """The extension for an image starting with `head`, or None."""
+    for magic, ext in MAGIC:
+        if head.startswith(magic):
+            return ext
+    return None
+
+
+def part_path(upload_folder, upload):
+    return os.path.join(upload_folder, INCOMING_DIR, f"{upload.id}.part")
+
+
+def received(upload_folder, upload):
+    """Bytes stored so far, i.e. where the next chunk goes."""
+    try:
+        return os.path.getsize(part_path(upload_folder, upload))
+    except FileNotFoundError:
+        return 0
+
+
+def start(user_id, size, max_size):
+    if size < SNIFF_BYTES or size > max_size:
+        raise ValueError(f"Size must be between {SNIFF_BYTES} and {max_size} bytes.")
+    upload = Upload(id=secrets.token_hex(16), user_id=user_id, size=size)
+    db.session.add(upload)
+    return upload
+
+
+def write_chunk(upload_folder, upload, stream, client_offset):
+    """Append `stream` to the upload at `client_offset`. Returns the new offset.
+
+    Raises OffsetMismatch if the upload doesn't end at `client_offset` or
+    another chunk is being written to it, and ValueError, leaving the
+    upload as it was, if the data runs past the announced size or doesn't
+    start like a supported image.
+    """
+    path = part_path(upload_folder, upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        try:
+            # held until the file is closed; a concurrent writer gets a 409
+            # instead of waiting out this whole chunk
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise OffsetMismatch(received(upload_folder, upload)) from None
+        offset = start_offset = f.seek(0, os.SEEK_END)
+        if offset != client_offset:
+            raise OffsetMismatch(offset)
+        head = b""
+        if upload.ext is None and offset:
+            with open(path, "rb") as existing:
+                head = existing.read(SNIFF_BYTES)
+        try:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                if offset + len(chunk) > upload.size:
+                    raise ValueError("More data than the announced size.")
+                if upload.ext is None:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                    if len(head) >= SNIFF_BYTES:
+                        upload.ext = sniff(head)
+                        if upload.ext is None:
+                            raise ValueError("Only JPG, PNG, GIF images are allowed.")
+                f.write(chunk)
+                offset += len(chunk)
+        except ValueError:
+            f.truncate(start_offset)
+            raise
+    return offset
+
+
+def finish(upload_folder, upload):
+    """Move a complete upload to its content address, taking a reference
+    to it; returns the filename. The caller commits."""
+    if upload.ext is None or received(upload_folder, upload) != upload.size:
+        raise ValueError("Upload is incomplete.")
+    filename, _ = store_file(part_path(upload_folder, upload), upload_folder, upload.ext)
+    db.session.delete(upload)
+    return filename
+
+
+def discard(upload_folder, upload):
+    try:
+        os.remove(part_path(upload_folder, upload))
+    except FileNotFoundError:
+        pass
+    db.session.delete(upload)
+
+
+def prune(upload_folder, max_age):
+    """Remove uploads started more than `max_age` ago. Returns how many."""
+    stale = Upload.query.filter(Upload.created_at < datetime.utcnow() - max_age).all()
+    for upload in stale:
+        discard(upload_folder, upload)
+    db.session.commit()
+    return len(stale)
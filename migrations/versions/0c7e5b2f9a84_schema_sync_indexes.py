@@ -0,0 +1,109 @@
+"""sync legacy tables with the models; index foreign keys and hot filters
+
+Revision ID: 0c7e5b2f9a84
+Revises: f4a8c61d2e90
+Create Date: 2026-10-18 19:12:37.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import create_search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = '0c7e5b2f9a84'
+down_revision = 'f4a8c61d2e90'
+branch_labels = None
+depends_on = None
+
+
+def _dedupe(table, a, b):
+    # association rows become NOT NULL and unique; drop the rows that can't be
+    op.execute(
+        f"CREATE TABLE {table}_dedupe AS SELECT DISTINCT {a}, {b} FROM {table} "
+        f"WHERE {a} IS NOT NULL AND {b} IS NOT NULL"
+    )
+    op.execute(f"DELETE FROM {table}")
+    op.execute(f"INSERT INTO {table} ({a}, {b}) SELECT {a}, {b} FROM {table}_dedupe")
+    op.execute(f"DROP TABLE {table}_dedupe")
+
+
+def upgrade():
+    _dedupe('followers', 'follower_id', 'followed_id')
+    with op.batch_alter_table('followers', schema=None) as batch_op:
+        batch_op.alter_column('follower_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('followed_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('uq_followers_follower_id_followed_id', ['follower_id', 'followed_id'], unique=True)
+        batch_op.create_index('ix_followers_followed_id', ['followed_id'], unique=False)
+
+    _dedupe('board_pins', 'board_id', 'pin_id')
+    with op.batch_alter_table('board_pins', schema=None) as batch_op:
+        batch_op.alter_column('board_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('pin_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('uq_board_pins_board_id_pin_id', ['board_id', 'pin_id'], unique=True)
+        batch_op.create_index('ix_board_pins_pin_id', ['pin_id'], unique=False)
+
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.create_index('ix_board_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.create_index('ix_pin_user_id', ['user_id'], unique=False)
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('ix_comment_pin_id_created_at', ['pin_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_comment_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('like', schema=None) as batch_op:
+        batch_op.create_index('ix_like_pin_id', ['pin_id'], unique=False)
+        batch_op.create_index('ix_like_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('saved_pin', schema=None) as batch_op:
+        batch_op.create_index('ix_saved_pin_pin_id', ['pin_id'], unique=False)
+        batch_op.create_index('ix_saved_pin_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.create_index('ix_message_sender_id', ['sender_id'], unique=False)
+        batch_op.create_index('ix_message_recipient_id', ['recipient_id'], unique=False)
+        batch_op.create_index('ix_message_pin_id', ['pin_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_pin_id')
+        batch_op.drop_index('ix_message_recipient_id')
+        batch_op.drop_index('ix_message_sender_id')
+
+    with op.batch_alter_table('saved_pin', schema=None) as batch_op:
+        batch_op.drop_index('ix_saved_pin_user_id_created_at')
+        batch_op.drop_index('ix_saved_pin_pin_id')
+
+    with op.batch_alter_table('like', schema=None) as batch_op:
+        batch_op.drop_index('ix_like_user_id_created_at')
+        batch_op.drop_index('ix_like_pin_id')
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_user_id')
+        batch_op.drop_index('ix_comment_pin_id_created_at')
+
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.drop_index('ix_pin_user_id')
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
+
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.drop_index('ix_board_user_id')
+
+    with op.batch_alter_table('board_pins', schema=None) as batch_op:
+        batch_op.drop_index('ix_board_pins_pin_id')
+        batch_op.drop_index('uq_board_pins_board_id_pin_id')
+        batch_op.alter_column('pin_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('board_id', existing_type=sa.Integer(), nullable=True)
+
+    with op.batch_alter_table('followers', schema=None) as batch_op:
+        batch_op.drop_index('ix_followers_followed_id')
+        batch_op.drop_index('uq_followers_follower_id_followed_id')
+        batch_op.alter_column('followed_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('follower_id', existing_type=sa.Integer(), nullable=True)
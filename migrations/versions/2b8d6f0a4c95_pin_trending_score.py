@@ -0,0 +1,35 @@
+"""pin.trending_score with a (trending_score, id) index
+
+Revision ID: 2b8d6f0a4c95
+Revises: 7e3c9a1f5b26
+Create Date: 2026-10-18 23:02:51.067331
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import create_search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8d6f0a4c95'
+down_revision = '7e3c9a1f5b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing likes/saves/comments are scored by `flask backfill-trending`
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('trending_score', sa.Float(), server_default='0', nullable=False))
+        batch_op.create_index('ix_pin_trending_score_id', ['trending_score', 'id'], unique=False)
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.drop_index('ix_pin_trending_score_id')
+        batch_op.drop_column('trending_score')
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
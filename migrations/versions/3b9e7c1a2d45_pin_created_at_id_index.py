@@ -0,0 +1,26 @@
+"""pin (created_at, id) index for keyset pagination
+
+Revision ID: 3b9e7c1a2d45
+Revises: f62830d1fcc4
+Create Date: 2026-10-18 09:12:04.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9e7c1a2d45'
+down_revision = 'f62830d1fcc4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.create_index('ix_pin_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.drop_index('ix_pin_created_at_id')
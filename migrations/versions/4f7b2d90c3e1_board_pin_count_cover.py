@@ -0,0 +1,34 @@
+"""board.pin_count and board.cover_filename
+
+Revision ID: 4f7b2d90c3e1
+Revises: 9a2d4e6b1c73
+Create Date: 2026-10-18 21:07:42.318904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f7b2d90c3e1'
+down_revision = '9a2d4e6b1c73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pin_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('cover_filename', sa.String(length=255), nullable=True))
+
+    # covers for existing boards come from `flask build-board-covers`
+    op.execute(
+        'UPDATE board SET pin_count = '
+        '(SELECT COUNT(*) FROM board_pins WHERE board_pins.board_id = board.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('board', schema=None) as batch_op:
+        batch_op.drop_column('cover_filename')
+        batch_op.drop_column('pin_count')
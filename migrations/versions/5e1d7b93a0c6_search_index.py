@@ -0,0 +1,96 @@
+"""full-text search index for pins and users
+
+On SQLite the index is kept in sync by triggers on pin and user. A
+batch_alter_table that rebuilds either table drops them, so every later
+migration that batch-alters pin or user calls create_search_triggers()
+afterwards, in upgrade and downgrade.
+
+Revision ID: 5e1d7b93a0c6
+Revises: c52a9e04d8f1
+Create Date: 2026-10-18 12:48:17.230964
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import create_search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1d7b93a0c6'
+down_revision = 'c52a9e04d8f1'
+branch_labels = None
+depends_on = None
+
+
+# keep in sync with app.search.PG_PIN_VECTOR
+PG_PIN_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+SQLITE_UPGRADE = [
+    # external-content tables: the text lives in pin/user, FTS5 keeps only the index;
+    # the triggers that keep them in sync come from create_search_triggers()
+    "CREATE VIRTUAL TABLE pin_fts USING fts5("
+    "title, description, tags, content='pin', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE user_fts USING fts5("
+    "username, content='user', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS user_fts_au",
+    "DROP TRIGGER IF EXISTS user_fts_ad",
+    "DROP TRIGGER IF EXISTS user_fts_ai",
+    "DROP TABLE IF EXISTS user_fts",
+    "DROP TRIGGER IF EXISTS pin_fts_au",
+    "DROP TRIGGER IF EXISTS pin_fts_ad",
+    "DROP TRIGGER IF EXISTS pin_fts_ai",
+    "DROP TABLE IF EXISTS pin_fts",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX ix_pin_search ON pin USING gin (({PG_PIN_VECTOR}))",
+    'CREATE INDEX ix_user_username_trgm ON "user" USING gin (username gin_trgm_ops)',
+]
+
+POSTGRES_DOWNGRADE = [
+    'DROP INDEX IF EXISTS ix_user_username_trgm',
+    "DROP INDEX IF EXISTS ix_pin_search",
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # the init revision predates Pin.tags, which the index covers
+    pin_columns = {c['name'] for c in sa.inspect(bind).get_columns('pin')}
+    if 'tags' not in pin_columns:
+        with op.batch_alter_table('pin', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('tags', sa.String(length=255), nullable=True))
+
+    if bind.dialect.name == 'sqlite':
+        statements = SQLITE_UPGRADE
+    elif bind.dialect.name == 'postgresql':
+        statements = POSTGRES_UPGRADE
+    else:
+        statements = []
+    for statement in statements:
+        op.execute(statement)
+    create_search_triggers(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        statements = SQLITE_DOWNGRADE
+    elif bind.dialect.name == 'postgresql':
+        statements = POSTGRES_DOWNGRADE
+    else:
+        statements = []
+    for statement in statements:
+        op.execute(statement)
@@ -0,0 +1,33 @@
+"""user.session_version for the identity cache
+
+Revision ID: 6c1f8a3d2e47
+Revises: 2b8d6f0a4c95
+Create Date: 2026-10-19 10:14:27.518340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import create_search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1f8a3d2e47'
+down_revision = '2b8d6f0a4c95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing cookies carry a bare user id, which load_user reads as version 0
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('session_version', sa.Integer(), server_default='0', nullable=False))
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('session_version')
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
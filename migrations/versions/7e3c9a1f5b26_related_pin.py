@@ -0,0 +1,38 @@
+"""related_pin table for "more like this"
+
+Revision ID: 7e3c9a1f5b26
+Revises: 4f7b2d90c3e1
+Create Date: 2026-10-18 22:14:09.542817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e3c9a1f5b26'
+down_revision = '4f7b2d90c3e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # filled by `flask build-related`
+    op.create_table('related_pin',
+    sa.Column('pin_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('related_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['pin_id'], ['pin.id'], ),
+    sa.ForeignKeyConstraint(['related_id'], ['pin.id'], ),
+    sa.PrimaryKeyConstraint('pin_id', 'rank')
+    )
+    with op.batch_alter_table('related_pin', schema=None) as batch_op:
+        batch_op.create_index('ix_related_pin_related_id', ['related_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('related_pin', schema=None) as batch_op:
+        batch_op.drop_index('ix_related_pin_related_id')
+
+    op.drop_table('related_pin')
@@ -0,0 +1,37 @@
+"""comment.parent_id and reply_count; (created_at, id) keyset indexes
+
+Revision ID: 8b4e2c6f1a39
+Revises: 1d9e5a7c3b08
+Create Date: 2026-10-19 14:05:48.213976
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4e2c6f1a39'
+down_revision = '1d9e5a7c3b08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing comments become top-level comments with no replies
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('reply_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_foreign_key('fk_comment_parent_id_comment', 'comment', ['parent_id'], ['id'])
+        batch_op.drop_index('ix_comment_pin_id_created_at')
+        batch_op.create_index('ix_comment_pin_id_created_at_id', ['pin_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_comment_parent_id_created_at_id', ['parent_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_parent_id_created_at_id')
+        batch_op.drop_index('ix_comment_pin_id_created_at_id')
+        batch_op.create_index('ix_comment_pin_id_created_at', ['pin_id', 'created_at'], unique=False)
+        batch_op.drop_constraint('fk_comment_parent_id_comment', type_='foreignkey')
+        batch_op.drop_column('reply_count')
+        batch_op.drop_column('parent_id')
@@ -0,0 +1,30 @@
+"""pin.updated_at for delta polling
+
+Revision ID: 8d41f0e6b7a3
+Revises: 3b9e7c1a2d45
+Create Date: 2026-10-18 10:03:51.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41f0e6b7a3'
+down_revision = '3b9e7c1a2d45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_pin_updated_at'), ['updated_at'], unique=False)
+
+    op.execute('UPDATE pin SET updated_at = created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pin_updated_at'))
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,58 @@
+"""following feed: timeline table and user.follower_count
+
+Revision ID: 9a2d4e6b1c73
+Revises: 0c7e5b2f9a84
+Create Date: 2026-10-18 19:48:03.611254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import create_search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = '9a2d4e6b1c73'
+down_revision = '0c7e5b2f9a84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('timeline',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('pin_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['pin_id'], ['pin.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'pin_id')
+    )
+    with op.batch_alter_table('timeline', schema=None) as batch_op:
+        batch_op.create_index('ix_timeline_pin_id', ['pin_id'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('follower_count', sa.Integer(), server_default='0', nullable=False))
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
+
+    op.execute(
+        'UPDATE "user" SET follower_count = '
+        '(SELECT COUNT(*) FROM followers WHERE followers.followed_id = "user".id)'
+    )
+    # existing follows get their timelines filled in
+    op.execute(
+        "INSERT INTO timeline (user_id, pin_id) "
+        "SELECT followers.follower_id, pin.id FROM followers "
+        "JOIN pin ON pin.user_id = followers.followed_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('follower_count')
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
+
+    with op.batch_alter_table('timeline', schema=None) as batch_op:
+        batch_op.drop_index('ix_timeline_pin_id')
+
+    op.drop_table('timeline')
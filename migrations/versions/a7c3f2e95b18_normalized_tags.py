@@ -0,0 +1,42 @@
+"""normalized tags: tag.pin_count and pin_tags indexes
+
+Revision ID: a7c3f2e95b18
+Revises: 5e1d7b93a0c6
+Create Date: 2026-10-18 14:05:33.861490
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3f2e95b18'
+down_revision = '5e1d7b93a0c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pin_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_tag_pin_count'), ['pin_count'], unique=False)
+
+    with op.batch_alter_table('pin_tags', schema=None) as batch_op:
+        batch_op.alter_column('pin_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('tag_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_index('uq_pin_tags_pin_id_tag_id', ['pin_id', 'tag_id'], unique=True)
+        batch_op.create_index('ix_pin_tags_tag_id_pin_id', ['tag_id', 'pin_id'], unique=False)
+
+    # existing Pin.tags text is parsed by `flask backfill-tags`
+
+
+def downgrade():
+    with op.batch_alter_table('pin_tags', schema=None) as batch_op:
+        batch_op.drop_index('ix_pin_tags_tag_id_pin_id')
+        batch_op.drop_index('uq_pin_tags_pin_id_tag_id')
+        batch_op.alter_column('tag_id', existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column('pin_id', existing_type=sa.Integer(), nullable=True)
+
+    with op.batch_alter_table('tag', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tag_pin_count'))
+        batch_op.drop_column('pin_count')
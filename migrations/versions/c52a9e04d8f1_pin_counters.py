@@ -0,0 +1,38 @@
+"""denormalized like/save/comment counters on pin
+
+Revision ID: c52a9e04d8f1
+Revises: 8d41f0e6b7a3
+Create Date: 2026-10-18 11:26:40.775019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52a9e04d8f1'
+down_revision = '8d41f0e6b7a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('save_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+
+    # backfill from the source tables (same as `flask backfill-counters`)
+    op.execute(
+        'UPDATE pin SET '
+        'like_count = (SELECT COUNT(*) FROM "like" WHERE "like".pin_id = pin.id), '
+        'save_count = (SELECT COUNT(*) FROM saved_pin WHERE saved_pin.pin_id = pin.id), '
+        'comment_count = (SELECT COUNT(*) FROM comment WHERE comment.pin_id = pin.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.drop_column('comment_count')
+        batch_op.drop_column('save_count')
+        batch_op.drop_column('like_count')
@@ -0,0 +1,40 @@
+"""pin image metadata and resized variants
+
+Revision ID: d19b4e7a6c02
+Revises: a7c3f2e95b18
+Create Date: 2026-10-18 15:22:09.517843
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import create_search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = 'd19b4e7a6c02'
+down_revision = 'a7c3f2e95b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('width', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('height', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('dominant_color', sa.String(length=7), nullable=True))
+        batch_op.add_column(sa.Column('variants', sa.String(length=64), nullable=True))
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
+
+    # existing uploads are processed by `flask build-thumbnails`
+
+
+def downgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.drop_column('variants')
+        batch_op.drop_column('dominant_color')
+        batch_op.drop_column('height')
+        batch_op.drop_column('width')
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
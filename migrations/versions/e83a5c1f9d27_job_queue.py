@@ -0,0 +1,53 @@
+"""background job queue and pin.processing_state
+
+Revision ID: e83a5c1f9d27
+Revises: d19b4e7a6c02
+Create Date: 2026-10-18 16:40:55.093311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.search import create_search_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83a5c1f9d27'
+down_revision = 'd19b4e7a6c02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=64), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('state', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.create_index('ix_job_state_run_after', ['state', 'run_after'], unique=False)
+
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('processing_state', sa.String(length=16), server_default='ready', nullable=False))
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
+
+
+def downgrade():
+    with op.batch_alter_table('pin', schema=None) as batch_op:
+        batch_op.drop_column('processing_state')
+    # a rebuilt table loses its search triggers
+    create_search_triggers(op.get_bind())
+
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_state_run_after')
+
+    op.drop_table('job')
@@ -0,0 +1,74 @@
+"""conversation summary table and message(conversation_id, id) index
+
+Revision ID: f4a8c61d2e90
+Revises: b6f20d8e4a13
+Create Date: 2026-10-18 18:05:12.740316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a8c61d2e90'
+down_revision = 'b6f20d8e4a13'
+branch_labels = None
+depends_on = None
+
+LOW = "CASE WHEN sender_id < recipient_id THEN sender_id ELSE recipient_id END"
+HIGH = "CASE WHEN sender_id < recipient_id THEN recipient_id ELSE sender_id END"
+
+
+def upgrade():
+    op.create_table('conversation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_a_id', sa.Integer(), nullable=False),
+    sa.Column('user_b_id', sa.Integer(), nullable=False),
+    sa.Column('last_message_id', sa.Integer(), nullable=True),
+    sa.Column('last_activity', sa.DateTime(), nullable=True),
+    sa.Column('unread_a', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('unread_b', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_a_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['user_b_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_a_id', 'user_b_id', name='uq_conversation_user_a_id_user_b_id')
+    )
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.create_index('ix_conversation_user_a_id_last_activity', ['user_a_id', 'last_activity'], unique=False)
+        batch_op.create_index('ix_conversation_user_b_id_last_activity', ['user_b_id', 'last_activity'], unique=False)
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('conversation_id', sa.Integer(), nullable=True))
+
+    # one conversation per user pair that has messages; nothing was tracked
+    # as read before, so unread counts start at zero
+    op.execute(
+        "INSERT INTO conversation "
+        "(user_a_id, user_b_id, last_message_id, last_activity, unread_a, unread_b, created_at) "
+        f"SELECT {LOW}, {HIGH}, MAX(id), MAX(created_at), 0, 0, MIN(created_at) "
+        f"FROM message GROUP BY {LOW}, {HIGH}"
+    )
+    op.execute(
+        "UPDATE message SET conversation_id = ("
+        "SELECT conversation.id FROM conversation "
+        f"WHERE conversation.user_a_id = {LOW} AND conversation.user_b_id = {HIGH})"
+    )
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.alter_column('conversation_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_message_conversation_id_conversation', 'conversation', ['conversation_id'], ['id'])
+        batch_op.create_index('ix_message_conversation_id_id', ['conversation_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_conversation_id_id')
+        batch_op.drop_constraint('fk_message_conversation_id_conversation', type_='foreignkey')
+        batch_op.drop_column('conversation_id')
+
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversation_user_b_id_last_activity')
+        batch_op.drop_index('ix_conversation_user_a_id_last_activity')
+
+    op.drop_table('conversation')